@@ -1,10 +1,16 @@
 """
 Database connection using Supabase REST API (HTTPS)
+The client is created on first use, so importing the app stays cheap (cold starts).
 """
 
 import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 load_dotenv()
 
@@ -12,12 +18,31 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
+
+
+def get_supabase() -> "Client":
+    """Process-wide Supabase client (the supabase package is imported here, not at startup)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not SUPABASE_URL or not SUPABASE_KEY:
+                    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+                from supabase import create_client
+                _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _client
+
+
+def __getattr__(name: str):
+    # Keeps `from app.database import supabase` working for scripts, lazily
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # For backward compatibility with existing code
 def get_db():
     """Dependency for FastAPI routes - returns supabase client"""
-    return supabase
\ No newline at end of file
+    return get_supabase()
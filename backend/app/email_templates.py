@@ -0,0 +1,190 @@
+"""
+Email templates - Jinja2 templates under app/templates/email, compiled once at import
+Shared layout and styles live in base.html. Each email type is rendered through
+Jinja once per (year, shared content) with markers for the per-recipient fields;
+an email is then the pre-rendered pieces joined with the escaped recipient values.
+"""
+
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from jinja2 import Environment, FileSystemLoader, TemplateError, nodes, select_autoescape
+from markupsafe import Markup, escape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates", "email")
+SITE_URL = os.getenv("SITE_URL", "https://aipersona.com")
+
+CATEGORY_EMOJI = {
+    'dog': '🐕',
+    'cat': '🐱',
+    'baby': '👶',
+    'human': '👤'
+}
+
+SUBJECTS = {
+    "welcome": "Welcome to AI Persona! 🎉",
+    "profile_created": "Profile Created: {profile_name} 🎯",
+    "recommendations": "New Products You'll Love! 💝",
+}
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,  # Templates never change while the process runs
+    cache_size=-1
+)
+# Same for every message - not rebuilt per render (year is passed at render time)
+_env.globals.update(site_url=SITE_URL)
+
+# Compiled once; rendering is a call into the generated code
+TEMPLATES = {name: _env.get_template(f"{name}.html") for name in SUBJECTS}
+PRODUCT_CARD = _env.get_template("product_card.html")
+
+PRODUCT_CARD_FIELDS = ("id", "name", "brand", "price", "description")
+MAX_PRODUCTS_PER_EMAIL = 5
+
+# Per-recipient variables, filled into the pre-rendered body. They must be used in
+# the templates as plain {{ field }} - a filter would be applied to the marker instead
+# (checked at import by check_recipient_fields, and per body by _compiled_body)
+RECIPIENT_FIELDS = {
+    "welcome": ("user_name",),
+    "profile_created": ("profile_name", "profile_category", "emoji"),
+    "recommendations": ("user_name",),
+}
+# Variables shared by many recipients (hashable) - one pre-rendered body per distinct value
+SHARED_FIELDS = {
+    "recommendations": ("product_cards",),
+}
+_MARKER = "\x00"  # Can't occur in escaped text
+
+
+def check_recipient_fields(env: Environment, fields: Iterable[str]) -> None:
+    """
+    Raise TemplateError if any template uses a recipient field other than as a plain
+    {{ field }} - a filter, test, condition or assignment would act on the marker
+    """
+    fields = set(fields)
+    for template_name in env.list_templates():
+        tree = env.parse(env.loader.get_source(env, template_name)[0])
+        plain = {id(node) for output in tree.find_all(nodes.Output) for node in output.nodes}
+        for node in tree.find_all(nodes.Name):
+            if node.name in fields and id(node) not in plain:
+                raise TemplateError(
+                    f"{template_name}:{node.lineno}: recipient field '{node.name}' must be output as plain "
+                    f"{{{{ {node.name} }}}} - move the logic into the context builder"
+                )
+
+
+check_recipient_fields(_env, (field for names in RECIPIENT_FIELDS.values() for field in names))
+
+
+@lru_cache(maxsize=4096)
+def _product_card(values: tuple) -> Markup:
+    return Markup(PRODUCT_CARD.render(product=dict(zip(PRODUCT_CARD_FIELDS, values))))
+
+
+def product_cards(products: List[Dict]) -> List[Markup]:
+    """
+    Rendered product cards, cached per product - a campaign recommends the same
+    few hundred products to thousands of users, so each card is rendered once
+    """
+    return [
+        _product_card(tuple(product.get(field) for field in PRODUCT_CARD_FIELDS))
+        for product in products[:MAX_PRODUCTS_PER_EMAIL]
+    ]
+
+
+def _with_emoji(context: Dict) -> Dict:
+    return {**context, "emoji": CATEGORY_EMOJI.get(context["profile_category"], '✨')}
+
+
+def _product_cards_builder():
+    """Adds product_cards; one builder per batch, memoizing each product list's cards"""
+    # Campaigns pass the same product list to many recipients - build its cards once per batch.
+    # The memo keeps the list alive, so its id can't be reused within the batch
+    memo: Dict[int, Tuple[List[Dict], Tuple[Markup, ...]]] = {}
+
+    def build(context: Dict) -> Dict:
+        products = context["products"]
+        products_and_cards = memo.get(id(products))
+        if products_and_cards is None or products_and_cards[0] is not products:
+            products_and_cards = memo[id(products)] = (products, tuple(product_cards(products)))
+        return {**context, "product_cards": products_and_cards[1]}
+
+    return build
+
+
+# Derived template variables, per email type - factories called once per render_bulk batch
+_CONTEXT_BUILDERS = {
+    "profile_created": lambda: _with_emoji,
+    "recommendations": _product_cards_builder,
+}
+
+
+def render(name: str, **context) -> Tuple[str, str]:
+    """Render one email. Returns (subject, html)"""
+    return render_bulk(name, [context])[0]
+
+
+def render_welcome(user_name: str) -> Tuple[str, str]:
+    return render("welcome", user_name=user_name)
+
+
+def render_profile_created(profile_name: str, profile_category: str) -> Tuple[str, str]:
+    return render("profile_created", profile_name=profile_name, profile_category=profile_category)
+
+
+def render_recommendations(user_name: str, products: List[Dict]) -> Tuple[str, str]:
+    return render("recommendations", user_name=user_name, products=products)
+
+
+def _splice(pieces: Tuple[str, ...], context: Dict) -> str:
+    html = list(pieces)
+    for i in range(1, len(pieces), 2):
+        html[i] = escape(context[pieces[i]])
+    return "".join(html)
+
+
+@lru_cache(maxsize=256)
+def _compiled_body(name: str, year: int, shared: Tuple) -> Tuple[str, ...]:
+    """
+    The template rendered once with a marker in place of each per-recipient field.
+    Returns the pieces: even indexes are HTML, odd indexes the field name to fill in.
+    Raises TemplateError if splicing wouldn't reproduce the plain render.
+    """
+    template = TEMPLATES[name]
+    fields = RECIPIENT_FIELDS[name]
+    markers = {field: Markup(f"{_MARKER}{field}{_MARKER}") for field in fields}
+    pieces = tuple(template.render(year=year, **dict(shared), **markers).split(_MARKER))
+
+    # Markers must pair up around known field names (breaks e.g. if shared content contains one)
+    if len(pieces) % 2 == 0 or any(piece not in markers for piece in pieces[1::2]):
+        raise TemplateError(f"{name}: recipient field markers don't line up after rendering")
+    # Each field spliced exactly where a plain render puts it (probe values escape to themselves)
+    probes = {field: f"probe{i}x{year}" for i, field in enumerate(fields)}
+    expected = template.render(year=year, **dict(shared), **probes)
+    if _splice(pieces, probes) != expected:
+        raise TemplateError(f"{name}: splicing recipient fields doesn't match the plain render")
+    return pieces
+
+
+def render_bulk(name: str, contexts: Iterable[Dict]) -> List[Tuple[str, str]]:
+    """
+    Render one template for many recipients (campaigns). Returns (subject, html) per context.
+    The template, subject and context builder are looked up once for the whole batch.
+    """
+    subject = SUBJECTS[name]
+    build = _CONTEXT_BUILDERS[name]() if name in _CONTEXT_BUILDERS else None
+    shared_fields = SHARED_FIELDS.get(name, ())
+    static_subject = "{" not in subject
+    year = datetime.now().year  # Not cached at import - long-running workers cross New Year
+
+    rendered = []
+    for context in contexts:
+        if build:
+            context = build(context)
+        pieces = _compiled_body(name, year, tuple((field, context[field]) for field in shared_fields))
+        rendered.append((subject if static_subject else subject.format(**context), _splice(pieces, context)))
+    return rendered
@@ -0,0 +1,135 @@
+"""
+HTTP caching helpers - ETags, conditional GET handling and a server-side
+cache of serialized response bodies for catalog endpoints
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.serialization import dumps
+
+# Browsers/CDN may reuse catalog responses for a minute, then revalidate with the ETag
+CATALOG_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+
+# Server-side entries expire so writes from other workers/scripts show up
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+_catalog_version = 1
+
+
+def catalog_version() -> int:
+    """Current catalog version - part of every catalog cache key"""
+    return _catalog_version
+
+
+def bump_catalog_version() -> None:
+    """Invalidate cached catalog responses after a product write in this process"""
+    global _catalog_version
+    _catalog_version += 1
+    response_cache.clear()
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match covers this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [tag.strip() for tag in header.split(",")]
+
+
+class ResponseCache:
+    """LRU cache of serialized bodies keyed by route + query, with a TTL"""
+
+    def __init__(self, max_entries: int = 1000, ttl: int = CATALOG_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, body, etag = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body, etag
+
+    def set(self, key: Tuple, body: bytes, etag: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _cache_key(request: Request) -> Tuple:
+    query = tuple(sorted(request.query_params.multi_items()))
+    return (catalog_version(), request.url.path, query)
+
+
+def tagged_json_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """Serve pre-encoded JSON with its ETag, or 304 if the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_json_response(
+    request: Request,
+    build: Callable[[], object],
+    cache_control: str = CATALOG_CACHE_CONTROL
+) -> Response:
+    """
+    Serve a catalog response from the server-side cache, building and storing it on a miss.
+    build() is only called on a miss; exceptions it raises (e.g. 404s) are not cached.
+    """
+    key = _cache_key(request)
+    cached = response_cache.get(key)
+    if cached is None:
+        body = dumps(build())
+        cached = (body, make_etag(body))
+        response_cache.set(key, *cached)
+
+    return tagged_json_response(request, cached[0], cached[1], cache_control)
+
+
+def conditional_json_response(
+    request: Request,
+    content,
+    cache_control: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Serialize content, tag it with an ETag and answer 304 if the client already has it"""
+    body = dumps(content)
+    etag = make_etag(body)
+
+    extra = {"ETag": etag, "Cache-Control": cache_control, **(headers or {})}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=extra)
+
+    return Response(content=body, media_type="application/json", headers=extra)
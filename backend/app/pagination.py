@@ -0,0 +1,33 @@
+"""
+Opaque keyset cursors for paginated endpoints
+"""
+
+import base64
+from datetime import datetime, timezone
+from typing import List
+
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of a row (e.g. created_at, id) as an opaque cursor"""
+    raw = "|".join(str(v) for v in values)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, parts: int = 2) -> List[str]:
+    """Decode a cursor back into its sort key values. Raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if len(values) != parts or not all(values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO timestamp as an aware UTC datetime (naive values are taken as UTC). Raises ValueError if malformed"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
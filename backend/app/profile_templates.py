@@ -2,6 +2,11 @@
 Profile Templates for Quick Setup
 """
 
+import json
+from typing import Dict, Tuple
+
+from app.http_cache import make_etag
+
 PROFILE_TEMPLATES = {
     "dog": {
         "name": "Dog Profiles",
@@ -296,8 +301,62 @@ def get_templates_by_category(category: str):
     return PROFILE_TEMPLATES.get(category, {})
 
 
+# (category, preset_id) -> preset, built once at import
+PRESET_INDEX = {
+    (category, preset["id"]): preset
+    for category, category_data in PROFILE_TEMPLATES.items()
+    for preset in category_data.get("presets", [])
+}
+
+
 def get_preset_by_id(category: str, preset_id: str):
     """Get a specific preset template"""
-    category_data = PROFILE_TEMPLATES.get(category, {})
-    presets = category_data.get("presets", [])
-    return next((p for p in presets if p["id"] == preset_id), None)
\ No newline at end of file
+    return PRESET_INDEX.get((category, preset_id))
+
+
+# ============================================
+# PRE-ENCODED PAYLOADS
+# Templates are static, so every response body (and its ETag) is
+# encoded once at startup and served as raw bytes.
+# ============================================
+
+CATEGORY_NOT_FOUND = {"error": "Category not found", "available": ["dog", "cat", "baby", "human"]}
+PRESET_NOT_FOUND = {"error": "Preset not found"}
+
+
+def _encode(content) -> Tuple[bytes, str]:
+    # Same encoding FastAPI's JSONResponse uses
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return body, make_etag(body)
+
+
+def compile_template_payloads() -> Dict[Tuple, Tuple[bytes, str]]:
+    """Encode every templates endpoint response to (body, etag)"""
+    payloads = {
+        ("all",): _encode(PROFILE_TEMPLATES),
+        ("category_not_found",): _encode(CATEGORY_NOT_FOUND),
+        ("preset_not_found",): _encode(PRESET_NOT_FOUND),
+    }
+    for category, category_data in PROFILE_TEMPLATES.items():
+        payloads[("category", category)] = _encode(category_data)
+    for key, preset in PRESET_INDEX.items():
+        payloads[("preset",) + key] = _encode(preset)
+    return payloads
+
+
+TEMPLATE_PAYLOADS = compile_template_payloads()
+
+
+def get_all_templates_payload() -> Tuple[bytes, str]:
+    """Pre-encoded (body, etag) for all templates"""
+    return TEMPLATE_PAYLOADS[("all",)]
+
+
+def get_category_payload(category: str) -> Tuple[bytes, str]:
+    """Pre-encoded (body, etag) for a category, or the not-found body"""
+    return TEMPLATE_PAYLOADS.get(("category", category)) or TEMPLATE_PAYLOADS[("category_not_found",)]
+
+
+def get_preset_payload(category: str, preset_id: str) -> Tuple[bytes, str]:
+    """Pre-encoded (body, etag) for a preset, or the not-found body"""
+    return TEMPLATE_PAYLOADS.get(("preset", category, preset_id)) or TEMPLATE_PAYLOADS[("preset_not_found",)]
@@ -4,21 +4,35 @@ Authentication API Router - Supabase REST API version
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from app.database import get_db
 from app.schemas import UserRegister, UserLogin, TokenResponse, UserResponse, ProfileResponse
 from app.services.auth_service import AuthService
 from app.services.profile_service import ProfileService
+from app.services.rate_limit_service import get_rate_limiter
 
 router = APIRouter()
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+
+def enforce_email_rate_limit(scope: str, email: str) -> None:
+    """Reject with 429 when an email has exhausted its bucket"""
+    allowed, retry_after = get_rate_limiter().check_email(scope, email)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts for this account, please try again later",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
 
 
 @router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserRegister, db = Depends(get_db)):
     """Register a new user"""
+    enforce_email_rate_limit("register", user_data.email)
     service = AuthService(db)
     
     try:
@@ -40,6 +54,7 @@ async def register(user_data: UserRegister, db = Depends(get_db)):
 @router.post("/login", response_model=TokenResponse)
 async def login(credentials: UserLogin, db = Depends(get_db)):
     """Login user"""
+    enforce_email_rate_limit("login", credentials.email)
     service = AuthService(db)
     
     user = service.authenticate_user(credentials.email, credentials.password)
@@ -92,6 +107,16 @@ async def get_current_user(
     return user
 
 
+def get_optional_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[str]:
+    """User id from a valid bearer token, or None for anonymous requests (no DB lookup)"""
+    if credentials is None:
+        return None
+    payload = AuthService.decode_token(credentials.credentials)
+    return payload.get("sub") if payload else None
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user = Depends(get_current_user)):
     """Get current user information"""
@@ -2,56 +2,233 @@
 Products API Router - Supabase REST API version
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from typing import Any, Dict, List, Optional, Union
 from uuid import UUID
 
 from app.database import get_db
-from app.schemas import ProductResponse
-from app.services.product_service import ProductService
+from app.routers.auth import get_optional_user_id
+from app.http_cache import cached_json_response
+from app.schemas import (
+    ProductResponse, ProductCardResponse, ProductListResponse,
+    KeyFeaturesBatchRequest, KeyFeaturesBatchResponse, ProductKeyFeatures
+)
+from app.services.ai_service import AIService
+from app.services.product_service import ProductService, resolve_product_columns
+from app.services.facet_service import PRICE_BANDS, get_facet_index
+from app.services.key_feature_service import KeyFeatureService
+from app.services.rate_limit_service import get_rate_limiter, get_client_ip
 
 router = APIRouter()
 
+VIEW_PATTERN = "^(card|detail)$"
 
-@router.get("/", response_model=List[ProductResponse])
+
+def facet_filters(
+    brand: Optional[List[str]] = Query(None),
+    price_band: Optional[List[str]] = Query(None),
+    grain_free: Optional[bool] = Query(None),
+    life_stage: Optional[List[str]] = Query(None),
+    exclude_allergen: Optional[List[str]] = Query(None)
+) -> dict:
+    """Facet filters shared by the product list and facet endpoints (repeat a param to OR values)"""
+    for band in price_band or []:
+        if band not in [name for name, _, _ in PRICE_BANDS]:
+            raise HTTPException(status_code=422, detail=f"Unknown price_band: {band}")
+    filters = {
+        "brand": brand,
+        "price_band": price_band,
+        "grain_free": grain_free,
+        "life_stage": life_stage,
+        "exclude_allergen": exclude_allergen,
+    }
+    return {k: v for k, v in filters.items() if v is not None and v != []}
+
+
+def _columns_or_400(view: str, fields: Optional[str]) -> str:
+    try:
+        return resolve_product_columns(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _serialize_products(rows: List[dict], view: str, fields: Optional[str]) -> list:
+    """Validate rows against the model for the requested projection (raw rows for ?fields=)"""
+    if fields:
+        return rows
+    model = ProductCardResponse if view == "card" else ProductResponse
+    return [model(**row) for row in rows]
+
+
+@router.get("/", response_model=ProductListResponse)
 async def list_products(
+    request: Request,
     pet_type: Optional[str] = Query(None, pattern="^(dog|cat|baby|human)$"),
     product_category: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    view: str = Query("detail", pattern=VIEW_PATTERN),
+    fields: Optional[str] = Query(None),
+    filters: dict = Depends(facet_filters),
     db = Depends(get_db)
 ):
     """
-    List all products with optional filtering
+    List all products with optional filtering, newest first
     
     - **pet_type**: Filter by dog or cat
     - **product_category**: Filter by product category
-    - **skip**: Number of items to skip (pagination)
+    - **cursor**: next_cursor / prev_cursor from a previous page
+    - **skip**: Number of items to skip (legacy offset pagination, ignored with cursor)
     - **limit**: Max number of items to return
+    - **view**: `card` (grid fields only) or `detail` (full rows)
+    - **fields**: Comma-separated columns, overrides view
+    - **brand**, **price_band**, **grain_free**, **life_stage**, **exclude_allergen**:
+      facet filters, served from the in-memory facet index
     """
     service = ProductService(db)
-    return service.list_products(pet_type=pet_type, product_category=product_category, skip=skip, limit=limit)
+    columns = _columns_or_400(view, fields)
+    
+    def build():
+        if filters:
+            return build_from_facet_index()
+        
+        try:
+            page = service.list_products_page(
+                pet_type=pet_type,
+                product_category=product_category,
+                limit=limit,
+                cursor=cursor,
+                skip=skip,
+                columns=columns
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Products are validated once against their projection model
+        return {
+            "products": _serialize_products(page["products"], view, fields),
+            "total": page["total"],
+            "page": None if cursor else skip // limit + 1,
+            "page_size": limit,
+            "next_cursor": page["next_cursor"],
+            "prev_cursor": page["prev_cursor"]
+        }
+    
+    def build_from_facet_index():
+        # Match and paginate in memory, then fetch only the page's rows
+        index = get_facet_index(db)
+        ids = index.match(pet_type, product_category, filters)
+        try:
+            page_ids, next_cursor, prev_cursor = index.page(ids, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        rows = service.get_products_by_ids(page_ids, columns=columns) if page_ids else []
+        position = {pid: i for i, pid in enumerate(page_ids)}
+        rows.sort(key=lambda row: position.get(str(row['id']), len(position)))
+        
+        return {
+            "products": _serialize_products(rows, view, fields),
+            "total": len(ids),
+            "page": None,
+            "page_size": limit,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor
+        }
+    
+    return cached_json_response(request, build)
+
+
+@router.get("/facets")
+async def get_product_facets(
+    request: Request,
+    pet_type: Optional[str] = Query(None, pattern="^(dog|cat|baby|human)$"),
+    product_category: Optional[str] = Query(None),
+    filters: dict = Depends(facet_filters),
+    db = Depends(get_db)
+):
+    """
+    Facet counts for the catalog under the given filters
+    
+    Returns the matching total plus per-value counts for product_category, brand,
+    price_band, grain_free, life_stage and allergen_free (products free of each allergen).
+    Each facet ignores its own selection, so counts show what selecting another value would give.
+    """
+    return cached_json_response(
+        request,
+        lambda: get_facet_index(db).facet_counts(pet_type, product_category, filters)
+    )
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: UUID, db = Depends(get_db)):
+async def get_product(request: Request, product_id: UUID, db = Depends(get_db)):
     """Get a specific product by ID"""
     service = ProductService(db)
-    product = service.get_product(product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    
+    def build():
+        product = service.get_product(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return ProductResponse(**product)
+    
+    return cached_json_response(request, build)
 
 
-@router.get("/search/", response_model=List[ProductResponse])
+@router.get("/search/", response_model=List[Union[ProductResponse, ProductCardResponse, Dict[str, Any]]])
 async def search_products(
+    request: Request,
     query: str = Query(..., min_length=2),
     pet_type: Optional[str] = Query(None, pattern="^(dog|cat)$"),
+    view: str = Query("detail", pattern=VIEW_PATTERN),
+    fields: Optional[str] = Query(None),
     db = Depends(get_db)
 ):
-    """Search products by name or brand"""
+    """Search products by name or brand (view/fields work as in the product list)"""
     service = ProductService(db)
-    return service.search_products(query=query, pet_type=pet_type)
+    columns = _columns_or_400(view, fields)
+    return cached_json_response(request, lambda: _serialize_products(
+        service.search_products(query=query, pet_type=pet_type, columns=columns), view, fields
+    ))
+
+
+@router.post("/key-features:batch", response_model=KeyFeaturesBatchResponse)
+async def get_key_features_batch(
+    batch: KeyFeaturesBatchRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user_id: Optional[str] = Depends(get_optional_user_id),
+    db = Depends(get_db)
+):
+    """
+    Key features for a whole grid in one request
+    
+    Stored features come back from a single query. Products without features get
+    placeholder features (pending=true) and are generated in the background;
+    ask again later to pick up the real ones. Scheduling generation is rate
+    limited per signed-in user (per client IP when anonymous) - over the limit,
+    placeholders are returned without it.
+    """
+    service = KeyFeatureService(db)
+    cached, missing = service.get_for_grid(batch.product_ids)
+    placeholders = {str(p['id']): AIService.fallback_key_features(p) for p in missing}
+    
+    if missing:
+        allowed, _ = get_rate_limiter().check_generation(get_client_ip(request), user_id)
+        if allowed:
+            background_tasks.add_task(service.generate_missing, missing)
+    
+    results, not_found = [], []
+    for product_id in dict.fromkeys(batch.product_ids):
+        pid = str(product_id)
+        if pid in cached:
+            results.append(ProductKeyFeatures(product_id=product_id, key_features=cached[pid]))
+        elif pid in placeholders:
+            results.append(ProductKeyFeatures(product_id=product_id, key_features=placeholders[pid], pending=True))
+        else:
+            not_found.append(product_id)
+    
+    return KeyFeaturesBatchResponse(results=results, not_found=not_found)
 
 
 @router.get("/{product_id}/key-features")
@@ -60,41 +237,14 @@ async def get_product_key_features(
     db = Depends(get_db)
 ):
     """Get AI-generated key features for a product (cached or generate on-demand)"""
-    from app.services.ai_service import AIService
-    
-    service = ProductService(db)
-    product = service.get_product(product_id)
-    if not product:
+    service = KeyFeatureService(db)
+    result = await service.get_or_generate(product_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Check if features are already cached in attributes
-    if product.get('attributes') and product['attributes'].get('ai_key_features'):
-        return {
-            "product_id": str(product_id),
-            "key_features": product['attributes']['ai_key_features'],
-            "cached": True
-        }
-    
-    # Generate on-demand if not cached
-    ai_service = AIService()
-    
-    # Convert dict to object-like for AI service compatibility
-    class ProductObj:
-        def __init__(self, data):
-            for k, v in data.items():
-                setattr(self, k, v)
-    
-    product_obj = ProductObj(product)
-    key_features = await ai_service.generate_product_key_features(product_obj)
-    
-    # Cache for future use
-    if not product.get('attributes'):
-        product['attributes'] = {}
-    product['attributes']['ai_key_features'] = key_features
-    service.update_product(product_id, {"attributes": product['attributes']})
-    
+    key_features, cached = result
     return {
         "product_id": str(product_id),
         "key_features": key_features,
-        "cached": False
-    }
\ No newline at end of file
+        "cached": cached
+    }
@@ -33,14 +33,11 @@ async def get_profile(
 ):
     """Get profile by ID"""
     service = ProfileService(db)
-    profile = service.get_profile(profile_id)
+    # Ownership is part of the query - someone else's profile is reported as not found
+    profile = service.get_user_profile(profile_id, user_id=UUID(current_user['id']))
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
-    # Check ownership
-    if profile['user_id'] != current_user['id']:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
     return profile
 
 
@@ -53,15 +50,11 @@ async def update_profile(
 ):
     """Update an existing profile"""
     service = ProfileService(db)
-    profile = service.get_profile(profile_id)
+    profile = service.update_user_profile(profile_id, UUID(current_user['id']), profile_update)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
-    # Check ownership
-    if profile['user_id'] != current_user['id']:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    return service.update_profile(profile_id, profile_update)
+    return profile
 
 
 @router.delete("/{profile_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -72,15 +65,7 @@ async def delete_profile(
 ):
     """Delete a profile"""
     service = ProfileService(db)
-    profile = service.get_profile(profile_id)
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile not found")
-    
-    # Check ownership
-    if profile['user_id'] != current_user['id']:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    success = service.delete_profile(profile_id)
+    success = service.delete_user_profile(profile_id, UUID(current_user['id']))
     if not success:
         raise HTTPException(status_code=404, detail="Profile not found")
-    return None
\ No newline at end of file
+    return None
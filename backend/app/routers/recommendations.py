@@ -9,10 +9,14 @@ from app.database import get_db
 from app.schemas import (
     RecommendationRequest, 
     RecommendationResponse,
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
     ComparisonRequest,
     ComparisonResponse
 )
 from app.services.recommendation_service import RecommendationService
+from app.serialization import FastJSONResponse
+from app.routers.auth import get_current_user
 
 router = APIRouter()
 
@@ -34,11 +38,43 @@ async def get_recommendations(
     service = RecommendationService(db)
     
     try:
-        return await service.generate_recommendations(
+        result = await service.generate_recommendations(
             profile_id=request.profile_id,
             limit=request.limit,
             force_refresh=request.force_refresh
         )
+        # Already validated by the service - serialize directly with orjson
+        return FastJSONResponse(result)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate recommendations: {str(e)}")
+
+
+@router.post("/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(
+    request: BatchRecommendationRequest,
+    current_user = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Get recommendations for all (or selected) profiles of the current user in one call
+    
+    - Loads profiles, products and cached recommendations once for the whole batch
+    - Shares the product catalog between profiles of the same category
+    - Processes profiles concurrently (bounded)
+    """
+    service = RecommendationService(db)
+    
+    try:
+        result = await service.generate_recommendations_batch(
+            user_id=UUID(current_user['id']),
+            profile_ids=request.profile_ids,
+            limit=request.limit,
+            force_refresh=request.force_refresh
+        )
+        # Already validated by the service - serialize directly with orjson
+        return FastJSONResponse(result)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -60,10 +96,12 @@ async def compare_products(
     service = RecommendationService(db)
     
     try:
-        return await service.compare_products(
+        result = await service.compare_products(
             profile_id=request.profile_id,
             product_ids=request.product_ids
         )
+        # Already validated by the service - serialize directly with orjson
+        return FastJSONResponse(result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -2,31 +2,32 @@
 Profile Templates API Router
 """
 
-from fastapi import APIRouter
-from app.profile_templates import get_all_templates, get_templates_by_category, get_preset_by_id
+from fastapi import APIRouter, Request
+from app.http_cache import tagged_json_response
+from app.profile_templates import get_all_templates_payload, get_category_payload, get_preset_payload
 
 router = APIRouter()
 
+# Templates only change with a deploy
+TEMPLATES_CACHE_CONTROL = "public, max-age=86400"
+
 
 @router.get("/")
-async def list_all_templates():
+async def list_all_templates(request: Request):
     """Get all profile templates grouped by category"""
-    return get_all_templates()
+    body, etag = get_all_templates_payload()
+    return tagged_json_response(request, body, etag, TEMPLATES_CACHE_CONTROL)
 
 
 @router.get("/{category}")
-async def get_category_templates(category: str):
+async def get_category_templates(request: Request, category: str):
     """Get templates for a specific category"""
-    templates = get_templates_by_category(category)
-    if not templates:
-        return {"error": "Category not found", "available": ["dog", "cat", "baby", "human"]}
-    return templates
+    body, etag = get_category_payload(category)
+    return tagged_json_response(request, body, etag, TEMPLATES_CACHE_CONTROL)
 
 
 @router.get("/{category}/{preset_id}")
-async def get_preset_template(category: str, preset_id: str):
+async def get_preset_template(request: Request, category: str, preset_id: str):
     """Get a specific preset template"""
-    preset = get_preset_by_id(category, preset_id)
-    if not preset:
-        return {"error": "Preset not found"}
-    return preset
\ No newline at end of file
+    body, etag = get_preset_payload(category, preset_id)
+    return tagged_json_response(request, body, etag, TEMPLATES_CACHE_CONTROL)
\ No newline at end of file
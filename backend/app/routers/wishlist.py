@@ -2,31 +2,67 @@
 Wishlist API Router - Supabase REST API version
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
 from uuid import UUID
 
 from app.database import get_db
+from app.http_cache import conditional_json_response
 from app.routers.auth import get_current_user
-from app.schemas import WishlistResponse, WishlistCreate
+from app.schemas import WishlistResponse, WishlistCreate, WishlistBulkCreate, WishlistBulkResponse
+from app.services.wishlist_service import WishlistService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[WishlistResponse])
 async def get_wishlist(
+    request: Request,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    expand: bool = Query(False),
     current_user = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Get user's wishlist with product details"""
+    """
+    Get user's wishlist with product details, newest first
+    
+    - **limit**: Max number of items to return
+    - **cursor**: Value of the X-Next-Cursor header from the previous page
+    - **expand**: Include full product rows instead of card fields
+    
+    Responds 304 when If-None-Match matches the current ETag.
+    """
+    try:
+        service = WishlistService(db)
+        items, next_cursor = service.get_wishlist(
+            UUID(current_user['id']),
+            limit=limit,
+            cursor=cursor,
+            expand=expand
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch wishlist: {str(e)}")
+    
+    return conditional_json_response(
+        request,
+        [WishlistResponse(**item) for item in items],
+        cache_control="private, no-cache",
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+    )
+
+
+@router.get("/product-ids", response_model=List[str])
+async def get_wishlist_product_ids(
+    current_user = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """IDs of every product in the user's wishlist - lightweight, for in-wishlist markers"""
     try:
-        # Fetch wishlist items with product data using Supabase
-        response = db.table('wishlists')\
-            .select('*, product:products(*)')\
-            .eq('user_id', str(current_user['id']))\
-            .execute()
-        
-        return response.data
+        service = WishlistService(db)
+        return service.get_product_ids(UUID(current_user['id']))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch wishlist: {str(e)}")
 
@@ -39,33 +75,46 @@ async def add_to_wishlist(
 ):
     """Add a product to wishlist"""
     try:
-        # Check if already exists
-        existing = db.table('wishlists')\
-            .select('id')\
-            .eq('user_id', str(current_user['id']))\
-            .eq('product_id', str(wishlist_item.product_id))\
-            .execute()
-        
-        if existing.data:
+        service = WishlistService(db)
+        item = service.add_item(
+            user_id=UUID(current_user['id']),
+            product_id=wishlist_item.product_id,
+            profile_id=wishlist_item.profile_id,
+            notes=wishlist_item.notes
+        )
+
+        if not item:
             raise HTTPException(status_code=400, detail="Product already in wishlist")
-        
-        # Insert new wishlist item
-        data = {
-            'user_id': str(current_user['id']),
-            'product_id': str(wishlist_item.product_id),
-            'profile_id': str(wishlist_item.profile_id) if wishlist_item.profile_id else None,
-            'notes': wishlist_item.notes
-        }
-        
-        result = db.table('wishlists').insert(data).execute()
-        return result.data[0]
-    
+
+        return item
+
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add to wishlist: {str(e)}")
 
 
+@router.post("/bulk", response_model=WishlistBulkResponse, status_code=status.HTTP_201_CREATED)
+async def add_many_to_wishlist(
+    wishlist_items: WishlistBulkCreate,
+    current_user = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Add several products to wishlist at once (e.g. from a comparison)"""
+    try:
+        service = WishlistService(db)
+        added, already_present = service.add_items(
+            user_id=UUID(current_user['id']),
+            product_ids=wishlist_items.product_ids,
+            profile_id=wishlist_items.profile_id,
+            notes=wishlist_items.notes
+        )
+        return WishlistBulkResponse(added=added, already_present=already_present)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to add to wishlist: {str(e)}")
+
+
 @router.delete("/{wishlist_id}")
 async def remove_from_wishlist(
     wishlist_id: UUID,
@@ -74,24 +123,13 @@ async def remove_from_wishlist(
 ):
     """Remove an item from wishlist by wishlist ID"""
     try:
-        # Verify ownership before deleting
-        existing = db.table('wishlists')\
-            .select('id')\
-            .eq('id', str(wishlist_id))\
-            .eq('user_id', str(current_user['id']))\
-            .execute()
-        
-        if not existing.data:
+        service = WishlistService(db)
+        # Ownership is part of the delete filter
+        if not service.remove_item(UUID(current_user['id']), wishlist_id):
             raise HTTPException(status_code=404, detail="Wishlist item not found")
-        
-        # Delete the item
-        db.table('wishlists')\
-            .delete()\
-            .eq('id', str(wishlist_id))\
-            .execute()
-        
+
         return {"message": "Item removed from wishlist"}
-    
+
     except HTTPException:
         raise
     except Exception as e:
@@ -106,16 +144,12 @@ async def remove_by_product_id(
 ):
     """Remove an item from wishlist by product ID"""
     try:
-        # Delete by product_id and user_id
-        result = db.table('wishlists')\
-            .delete()\
-            .eq('user_id', str(current_user['id']))\
-            .eq('product_id', str(product_id))\
-            .execute()
-        
+        service = WishlistService(db)
+        service.remove_product(UUID(current_user['id']), product_id)
+
         # Supabase doesn't return deleted count, so we can't verify if something was deleted
         # Just return success
         return {"message": "Item removed from wishlist"}
-    
+
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to remove from wishlist: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to remove from wishlist: {str(e)}")
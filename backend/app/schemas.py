@@ -3,7 +3,7 @@ Pydantic Schemas for Request/Response validation
 """
 
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Union
 from datetime import datetime
 from uuid import UUID
 
@@ -84,18 +84,53 @@ class ProductResponse(BaseModel):
     pet_type: str
     product_category: Optional[str] = None
     attributes: Dict[str, Any]
+    key_features: Optional[List[str]] = None
     is_active: bool
     
     class Config:
         from_attributes = True
 
 
+class ProductCardResponse(BaseModel):
+    """Lightweight product for grids (view=card)"""
+    id: UUID
+    name: str
+    brand: str
+    price: float
+    price_unit: Optional[str] = None
+    image_url: Optional[str] = None
+    rating: float
+    pet_type: str
+    product_category: Optional[str] = None
+    ai_key_features: Optional[List[str]] = None
+
+
 class ProductListResponse(BaseModel):
     """Paginated product list"""
-    products: List[ProductResponse]
-    total: int
-    page: int
+    products: List[Union[ProductResponse, ProductCardResponse, Dict[str, Any]]]  # Shape depends on view/fields
+    total: int  # Estimated for large catalogs
+    page: Optional[int] = None  # Only known for offset (skip) requests
     page_size: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class KeyFeaturesBatchRequest(BaseModel):
+    """Product IDs for one grid of cards"""
+    product_ids: List[UUID] = Field(..., min_length=1, max_length=100)
+
+
+class ProductKeyFeatures(BaseModel):
+    """Key features for one card"""
+    product_id: UUID
+    key_features: List[str]
+    pending: bool = False  # Placeholder features; real ones are being generated
+
+
+class KeyFeaturesBatchResponse(BaseModel):
+    """Key features for a grid, with placeholders for products still being generated"""
+    results: List[ProductKeyFeatures]
+    not_found: List[UUID] = Field(default_factory=list)
 
 
 # ============================================
@@ -132,6 +167,20 @@ class RecommendationResponse(BaseModel):
     generated_at: datetime
 
 
+class BatchRecommendationRequest(BaseModel):
+    """Request recommendations for several (or all) of the user's profiles"""
+    profile_ids: Optional[List[UUID]] = Field(default=None, max_length=20, description="Defaults to all of the user's profiles")
+    limit: Optional[int] = Field(default=10, ge=1, le=50, description="Max number of products per profile")
+    force_refresh: Optional[bool] = Field(default=False, description="Bypass cache")
+
+
+class BatchRecommendationResponse(BaseModel):
+    """Recommendations for multiple profiles"""
+    results: List[RecommendationResponse]
+    errors: Dict[str, str] = Field(default_factory=dict, description="Profile ID -> error message")
+    generated_at: datetime
+
+
 # ============================================
 # COMPARISON SCHEMAS
 # ============================================
@@ -195,6 +244,11 @@ class WishlistCreate(BaseModel):
     profile_id: Optional[UUID] = None
     notes: Optional[str] = None
 
+class WishlistBulkCreate(BaseModel):
+    product_ids: List[UUID] = Field(..., min_length=1, max_length=50)
+    profile_id: Optional[UUID] = None
+    notes: Optional[str] = None
+
 class WishlistResponse(BaseModel):
     id: UUID
     user_id: UUID
@@ -205,4 +259,9 @@ class WishlistResponse(BaseModel):
     product: dict  # Contains product details from join
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class WishlistBulkResponse(BaseModel):
+    added: List[Dict[str, Any]]  # Newly inserted wishlist rows
+    already_present: List[UUID]  # Product IDs that were already in the wishlist
@@ -0,0 +1,81 @@
+"""
+Benchmark prompt size
+Builds each AI prompt for a sample profile and products and prints the
+estimated system / user tokens per call - run it after changing a prompt.
+No provider or database needed.
+Run with: python -m app.scripts.benchmark_prompt_tokens [--category dog]
+"""
+
+import argparse
+
+from app.services.ai_service import (
+    AIService,
+    COMPARISON_INSTRUCTIONS,
+    KEY_FEATURES_INSTRUCTIONS,
+    RECOMMENDATION_INSTRUCTIONS,
+)
+from app.services.ai_tokens import estimate_tokens
+
+SAMPLE_PROFILE = {
+    "name": "Rex", "age_years": 3, "weight_lbs": 65, "size_category": "large",
+    "allergies": ["chicken", "beef"], "health_conditions": ["joint issues"],
+}
+
+SAMPLE_PRODUCTS = [{
+    "id": str(i),
+    "name": f"Life Protection Formula Large Breed Adult #{i}",
+    "brand": "Blue Buffalo",
+    "price": 54.98,
+    "description": (
+        "Real deboned salmon first, wholesome whole grains, garden veggies and fruit, plus "
+        "LifeSource Bits, a precise blend of antioxidants, vitamins and minerals selected by "
+        "holistic veterinarians and animal nutritionists. Made without corn, wheat or soy."
+    ),
+    "attributes": {
+        "primary_protein": "salmon",
+        "ingredients": {
+            "full_list": ["Deboned Salmon", "Menhaden Fish Meal", "Brown Rice", "Barley", "Oatmeal",
+                          "Pea Starch", "Flaxseed", "Natural Flavor", "Peas", "Canola Oil"],
+            "allergens": ["fish"],
+        },
+        "nutrition": {"protein_pct": 24, "fat_pct": 14},
+        "life_stage": ["adult"],
+        "size_suitability": ["large", "giant"],
+    },
+} for i in (1, 2, 3)]
+
+SAMPLE_RECOMMENDATIONS = [{
+    "match_score": 88 - i,
+    "pros": ["Salmon protein avoids chicken and beef", "Glucosamine for joints", "No corn, wheat or soy"],
+    "cons": ["Contains fish", "Premium price"],
+} for i in range(3)]
+
+
+def run(category: str):
+    ai = AIService.__new__(AIService)  # Prompt builders only - no provider client
+    profile = {**SAMPLE_PROFILE, "profile_category": category}
+    products = [{**p, "pet_type": category} for p in SAMPLE_PRODUCTS]
+    prompts = {
+        "recommendation": (
+            ai._system_prompt(RECOMMENDATION_INSTRUCTIONS, category),
+            ai._build_recommendation_prompt(profile, products[0])
+        ),
+        "comparison": (
+            ai._system_prompt(COMPARISON_INSTRUCTIONS, category),
+            ai._build_comparison_prompt(profile, products, SAMPLE_RECOMMENDATIONS)
+        ),
+        "key_features": (KEY_FEATURES_INSTRUCTIONS, ai._build_key_features_prompt(products[0])),
+    }
+
+    print(f"📊 Estimated prompt tokens ({category})\n")
+    print(f"  {'operation':<16} {'system':>7} {'user':>7} {'total':>7}")
+    for operation, (system, prompt) in prompts.items():
+        system_tokens, user_tokens = estimate_tokens(system), estimate_tokens(prompt)
+        print(f"  {operation:<16} {system_tokens:>7} {user_tokens:>7} {system_tokens + user_tokens:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate the token size of each AI prompt")
+    parser.add_argument("--category", default="dog")
+    args = parser.parse_args()
+    run(args.category)
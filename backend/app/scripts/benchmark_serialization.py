@@ -0,0 +1,127 @@
+"""
+Benchmark response serialization for 50-item lists
+Compares FastAPI's default path (response_model re-validation + JSONResponse)
+with the orjson path used by our routes. No database needed.
+Run with: python -m app.scripts.benchmark_serialization
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from typing import List
+
+from app.schemas import ProductResponse, RecommendationResponse
+from app.serialization import dumps
+
+ITEMS = 50
+ROUNDS = 200
+
+
+def make_product(i: int) -> dict:
+    """Product row shaped like the seed data, including a realistic attributes blob"""
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"Life Protection Formula #{i}",
+        "brand": "Blue Buffalo",
+        "description": "Real chicken, wholesome grains, and LifeSource Bits with antioxidants for adult dogs.",
+        "price": 54.98,
+        "price_unit": "30 lb bag",
+        "image_url": "https://images.unsplash.com/photo-1534351450181-ea9f78427fe8?w=500&h=500&fit=crop",
+        "rating": 4.7,
+        "pet_type": "dog",
+        "product_category": "food",
+        "is_active": True,
+        "created_at": datetime.utcnow().isoformat(),
+        "attributes": {
+            "life_stage": ["adult"],
+            "size_suitability": ["all_sizes"],
+            "primary_protein": "chicken",
+            "grain_free": False,
+            "ingredients": {
+                "full_list": ["deboned chicken", "chicken meal", "brown rice", "barley", "oatmeal"],
+                "allergens": ["chicken", "rice", "barley", "oats"]
+            },
+            "nutrition": {"protein_pct": 24, "fat_pct": 14, "fiber_pct": 5, "calories_per_cup": 377},
+            "ai_key_features": ["Real chicken first ingredient", "Antioxidant-rich LifeSource Bits"]
+        }
+    }
+
+
+def make_recommendation_response() -> RecommendationResponse:
+    now = datetime.utcnow()
+    profile = {
+        "id": str(uuid.uuid4()),
+        "name": "Buddy",
+        "profile_category": "dog",
+        "age_years": 4,
+        "weight_lbs": 50,
+        "size_category": "medium",
+        "allergies": ["beef"],
+        "health_conditions": [],
+        "preferences": {"grain_free": True},
+        "profile_data": {"activity_level": "moderate"},
+        "created_at": now,
+        "updated_at": now
+    }
+    return RecommendationResponse(
+        profile=profile,
+        recommendations=[{
+            "product": make_product(i),
+            "is_safe": True,
+            "match_score": 80,
+            "explanation": "A balanced adult formula that avoids the profile's known allergens.",
+            "pros": ["High protein", "No beef", "Good value"],
+            "cons": ["Contains grains"],
+            "generated_at": now
+        } for i in range(ITEMS)],
+        total_safe_products=ITEMS,
+        total_filtered_out=0,
+        generated_at=now
+    )
+
+
+def timed(label: str, fn) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    per_call_ms = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f"  {label:<45} {per_call_ms:8.3f} ms")
+    return per_call_ms
+
+
+def run_benchmark():
+    loop = asyncio.new_event_loop()
+
+    recommendation_field = create_response_field(name="response", type_=RecommendationResponse)
+    product_list_field = create_response_field(name="response", type_=List[ProductResponse])
+
+    recommendations = make_recommendation_response()
+    product_rows = [make_product(i) for i in range(ITEMS)]
+
+    def fastapi_default(field, content):
+        serialized = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(serialized).body
+
+    print(f"📊 Serialization cost per {ITEMS}-item list ({ROUNDS} rounds)\n")
+
+    print("RecommendationResponse")
+    before = timed("before: response_model + JSONResponse", lambda: fastapi_default(recommendation_field, recommendations))
+    after = timed("after: validated once + orjson", lambda: dumps(recommendations))
+    print(f"  {'speedup':<45} {before / after:8.1f}x\n")
+
+    print("Product list")
+    before = timed("before: response_model + JSONResponse", lambda: fastapi_default(product_list_field, product_rows))
+    after = timed("after: validated once + orjson", lambda: dumps([ProductResponse(**p) for p in product_rows]))
+    print(f"  {'speedup':<45} {before / after:8.1f}x")
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    run_benchmark()
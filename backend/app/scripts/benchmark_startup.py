@@ -0,0 +1,72 @@
+"""
+Benchmark API cold start
+Starts uvicorn in a fresh process and measures the time until /health first
+answers 200 - what a Render free-tier wake-up waits for. No database needed.
+Run with: python -m app.scripts.benchmark_startup [--runs 5]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.scripts.check_import_time import BACKEND_DIR
+
+STARTUP_TIMEOUT = 30
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_health(env: dict) -> float:
+    """Seconds from process start to the first 200 from /health"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < STARTUP_TIMEOUT:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError(f"/health did not answer within {STARTUP_TIMEOUT}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run_benchmark(runs: int):
+    env = {
+        **os.environ,
+        "SUPABASE_URL": os.getenv("SUPABASE_URL", "https://example.supabase.co"),
+        "SUPABASE_KEY": os.getenv("SUPABASE_KEY", "startup-benchmark"),
+    }
+    print(f"📊 Time from process start to the first /health 200 ({runs} runs)\n")
+    samples = [time_to_health(env) for _ in range(runs)]
+    for i, seconds in enumerate(samples, 1):
+        print(f"  run {i}: {seconds * 1000:7.0f} ms")
+    print(f"\n  median {statistics.median(samples) * 1000:.0f} ms, "
+          f"min {min(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.runs)
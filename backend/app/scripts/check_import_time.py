@@ -0,0 +1,112 @@
+"""
+Import-time budget check for the API
+Imports `main` in a fresh interpreter with `python -X importtime`, reports the
+slowest modules and fails (exit 1) if the import is over budget or pulls in a
+module that should only load on first use.
+Run with: python -m app.scripts.check_import_time [--budget-ms 700] [--runs 5]
+CI runs it in the test-backend job (.github/workflows/deploy.yml).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "700"))
+
+# Heavy SDKs and clients that must stay out of `import main` (warm-up or first use loads them)
+LAZY_MODULES = [
+    "supabase",
+    "openai",
+    "anthropic",
+    "groq",
+    "ollama",
+    "jinja2",
+    "jose",
+    "passlib",
+    "aiosmtpd",
+    "redis",
+]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def profile_import() -> Tuple[float, Dict[str, float], List[str]]:
+    """One cold import of main. Returns (total ms, cumulative ms per direct import of main, modules loaded)"""
+    env = {
+        **os.environ,
+        # The import must not need real credentials
+        "SUPABASE_URL": os.getenv("SUPABASE_URL", "https://example.supabase.co"),
+        "SUPABASE_KEY": os.getenv("SUPABASE_KEY", "import-time-check"),
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{result.stderr[-2000:]}")
+
+    total_ms = 0.0
+    children: Dict[str, float] = {}
+    pending: Dict[str, float] = {}  # Children are listed before their parent
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        depth = len(name) - len(name.lstrip())
+        name = name.strip()
+        modules.append(name)
+        ms = int(cumulative) / 1000
+        if depth == 1:
+            if name == "main":
+                total_ms, children = ms, pending
+            pending = {}
+        elif depth == 3:
+            pending[name] = ms
+    return total_ms, children, modules
+
+
+def run_check(budget_ms: int, runs: int) -> bool:
+    totals = []
+    by_module: Dict[str, List[float]] = {}
+    loaded = set()
+    for _ in range(runs):
+        total_ms, children, modules = profile_import()
+        totals.append(total_ms)
+        for name, ms in children.items():
+            by_module.setdefault(name, []).append(ms)
+        loaded.update(modules)
+
+    median_ms = statistics.median(totals)
+    print(f"📊 import main: median {median_ms:.0f} ms over {runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}), budget {budget_ms} ms\n")
+
+    print("  Slowest imports from main:")
+    slowest = sorted(by_module.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:10]
+    for name, samples in slowest:
+        print(f"    {name:<32} {statistics.median(samples):8.1f} ms")
+
+    ok = True
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    if eager:
+        ok = False
+        print(f"\n❌ Imported at startup but should load lazily: {', '.join(eager)}")
+    if median_ms > budget_ms:
+        ok = False
+        print(f"\n❌ Import time {median_ms:.0f} ms is over the {budget_ms} ms budget")
+    if ok:
+        print("\n✅ Import time within budget, heavy SDKs load lazily")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the API's import-time budget")
+    parser.add_argument("--budget-ms", type=int, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(0 if run_check(args.budget_ms, args.runs) else 1)
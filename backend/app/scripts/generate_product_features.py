@@ -1,80 +1,229 @@
 """
 Generate and cache AI features for all products
 Run with: python -m app.scripts.generate_product_features
+
+Products are processed in ID order, one page at a time: up to --concurrency AI
+calls in flight (within the provider's request/token budget, queued behind
+interactive traffic), then one bulk write per page and a checkpoint. An
+interrupted run picks up after the last written page with --resume, first
+retrying the products that failed before the interruption.
+
+Try it offline: python -m app.scripts.generate_product_features --dry-run --fake-products 500
 """
 
-from app.database import SessionLocal
-from app.models import Product
-from app.services.ai_service import AIService
+import argparse
 import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.services.ai_rate_limiter import BATCH, get_limiter
+from app.services.key_feature_service import FEATURE_SOURCE_COLUMNS, KeyFeatureService, stored_features
+
+PAGE_SIZE = 100
+DEFAULT_CONCURRENCY = int(os.getenv("FEATURE_JOB_CONCURRENCY", "8"))
+CHECKPOINT_FILE = Path(os.getenv("FEATURE_JOB_CHECKPOINT", ".generate_product_features.json"))
+
+
+class FakeFeatureProvider:
+    """Stands in for AIService in dry runs: fixed latency, deterministic features, no network"""
+
+    provider = "fake"
+    model = "fake"
+
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    async def generate_product_key_features(self, product: Dict, fallback: bool = True, priority: int = BATCH) -> List[str]:
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Simulated provider error")
+        return [f"{product['brand']} quality you can trust", f"Made for {product.get('pet_type', 'everyone')}"]
+
+
+def make_fake_products(count: int) -> List[Dict]:
+    """Synthetic catalog for dry runs without a database"""
+    pet_types = ["dog", "cat", "baby", "human"]
+    products = [{
+        "id": str(uuid.uuid4()),
+        "name": f"Sample Product {i}",
+        "brand": "Sample Brand",
+        "description": "A product used to exercise the feature job.",
+        "pet_type": pet_types[i % len(pet_types)],
+        "attributes": {},
+        "key_features": None
+    } for i in range(count)]
+    return sorted(products, key=lambda p: p["id"])
+
+
+def get_supabase():
+    # Imported lazily so fake-product dry runs work without Supabase credentials
+    from app.database import supabase
+    return supabase
+
+
+def new_state() -> Dict:
+    return {"last_id": None, "updated": 0, "failed_ids": []}
+
+
+def load_checkpoint() -> Dict:
+    if CHECKPOINT_FILE.exists():
+        state = json.loads(CHECKPOINT_FILE.read_text())
+        state.setdefault("failed_ids", [])  # Checkpoints written before failed IDs were recorded
+        return state
+    return new_state()
+
+
+def save_checkpoint(state: Dict) -> None:
+    CHECKPOINT_FILE.write_text(json.dumps(state))
+
+
+def fetch_page(db, after_id: Optional[str], fake_products: Optional[List[Dict]] = None) -> List[Dict]:
+    """Next page of active products in ID order (keyset on id)"""
+    if fake_products is not None:
+        remaining = [p for p in fake_products if after_id is None or p["id"] > after_id]
+        return remaining[:PAGE_SIZE]
+
+    query = db.table('products').select(FEATURE_SOURCE_COLUMNS).eq('is_active', True)
+    if after_id:
+        query = query.gt('id', after_id)
+    return query.order('id').limit(PAGE_SIZE).execute().data
 
 
-async def generate_all_features():
-    """Generate key features for all products and store in attributes"""
-    db = SessionLocal()
-    ai_service = AIService()
-    
-    try:
-        # Get all active products
-        products = db.query(Product).filter(Product.is_active == True).all()
-        print(f"🔄 Generating features for {len(products)} products...")
-        
-        updated_count = 0
-        skipped_count = 0
-        
-        for product in products:
-            # Skip if features already exist
-            if product.attributes and product.attributes.get('ai_key_features'):
-                skipped_count += 1
-                continue
-            
+def fetch_by_ids(db, product_ids: List[str], fake_products: Optional[List[Dict]] = None) -> List[Dict]:
+    """Active products by ID (failed products from the checkpoint)"""
+    if fake_products is not None:
+        wanted = set(product_ids)
+        return [p for p in fake_products if p["id"] in wanted]
+
+    return db.table('products').select(FEATURE_SOURCE_COLUMNS)\
+        .eq('is_active', True)\
+        .in_('id', product_ids)\
+        .execute().data
+
+
+async def generate_all_features(
+    concurrency: int = DEFAULT_CONCURRENCY,
+    resume: bool = False,
+    dry_run: bool = False,
+    fake_products: int = 0,
+    fake_latency: float = 0.2
+):
+    """Generate key features for all products and store them in products.key_features"""
+    if dry_run:
+        ai_service = FakeFeatureProvider(latency=fake_latency)
+        catalog = make_fake_products(fake_products) if fake_products else None
+        db = None if catalog is not None else get_supabase()
+    else:
+        from app.services.ai_service import get_ai_service
+        db = get_supabase()
+        ai_service = get_ai_service()
+        catalog = None
+
+    feature_service = KeyFeatureService(db, ai_service)
+    limiter = get_limiter(ai_service.provider, ai_service.model)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    state = load_checkpoint() if resume else new_state()
+    if resume and state["last_id"]:
+        print(f"⏩ Resuming after product {state['last_id']} ({state['updated']} already updated, "
+              f"{len(state['failed_ids'])} failed products to retry)")
+
+    print(f"🔄 Generating features with {concurrency} concurrent requests "
+          f"({ai_service.provider}, {limiter.rpm or 'unlimited'} req/min, {limiter.tpm or 'unlimited'} tokens/min)"
+          f"{' - DRY RUN' if dry_run else ''}")
+
+    skipped_count = 0
+    started = time.perf_counter()
+    done_this_run = 0
+
+    async def generate(product: Dict) -> Optional[List[str]]:
+        async with semaphore:
             try:
-                # Convert Product object to dictionary for AI service
-                product_dict = {
-                    'name': product.name,
-                    'brand': product.brand,
-                    'description': product.description,
-                    'pet_type': product.pet_type,
-                    'attributes': product.attributes or {}
-                }
-                
-                # Generate features using AI
-                features = await ai_service.generate_product_key_features(product_dict)
-                
-                # Store in attributes
-                if not product.attributes:
-                    product.attributes = {}
-                
-                updated_attrs = dict(product.attributes)
-                updated_attrs['ai_key_features'] = features
-                product.attributes = updated_attrs
-
-                # Mark as modified (important for JSONB fields)
-                from sqlalchemy.orm.attributes import flag_modified
-                flag_modified(product, 'attributes')
-
-                db.commit()
-                updated_count += 1
-                
-                if updated_count % 10 == 0:
-                    print(f"✅ Progress: {updated_count}/{len(products)}")
-                
+                # Batch priority - waits for the provider budget behind interactive requests
+                return await ai_service.generate_product_key_features(product, fallback=False, priority=BATCH)
             except Exception as e:
-                print(f"❌ Failed for {product.name}: {e}")
-                db.rollback()
-                continue
-        
-        print(f"\n🎉 Successfully generated features for {updated_count} products")
-        print(f"⏭️  Skipped {skipped_count} products (already had features)")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
-        db.rollback()
-    finally:
-        db.close()
+                # Recorded in the checkpoint so --resume retries it
+                print(f"❌ Failed for {product['name']}: {e}")
+                return None
+
+    async def process(products: List[Dict]) -> List[str]:
+        """Generate and store features for the products missing them. Returns the IDs that failed"""
+        nonlocal skipped_count, done_this_run
+        # Skip if features already exist
+        todo = [p for p in products if not stored_features(p)]
+        skipped_count += len(products) - len(todo)
+
+        results = await asyncio.gather(*(generate(p) for p in todo))
+        updated = {str(p['id']): features for p, features in zip(todo, results) if features}
+
+        # One bulk write per page
+        if updated and not dry_run:
+            feature_service.store_many(updated)
+
+        state["updated"] += len(updated)
+        done_this_run += len(updated)
+        return [str(p['id']) for p in todo if str(p['id']) not in updated]
+
+    def checkpoint() -> None:
+        if not dry_run:
+            save_checkpoint(state)
+        elapsed = time.perf_counter() - started
+        print(f"✅ Progress: {state['updated']} updated, {len(state['failed_ids'])} failed, {skipped_count} skipped "
+              f"({done_this_run / elapsed:.1f} products/s)")
+
+    # Products that failed before an interruption - the scan below has already passed them
+    retry_ids = state["failed_ids"]
+    for i in range(0, len(retry_ids), PAGE_SIZE):
+        batch_ids = retry_ids[i:i + PAGE_SIZE]
+        still_failed = await process(fetch_by_ids(db, batch_ids, catalog))
+        # IDs no longer returned (deleted or deactivated) are dropped along with the successes
+        resolved = set(batch_ids) - set(still_failed)
+        state["failed_ids"] = [pid for pid in state["failed_ids"] if pid not in resolved]
+        checkpoint()
+
+    while True:
+        page = fetch_page(db, state["last_id"], catalog)
+        if not page:
+            break
+
+        state["failed_ids"] += await process(page)
+        state["last_id"] = page[-1]["id"]
+        checkpoint()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n🎉 Successfully generated features for {state['updated']} products in {elapsed:.1f}s")
+    print(f"⏭️  Skipped {skipped_count} products (already had features)")
+    if state["failed_ids"]:
+        # The finished run's checkpoint is removed, so a fresh run rescans and retries them
+        print(f"⚠️  {len(state['failed_ids'])} products failed - run again (without --resume) to retry them")
+
+    if not dry_run and CHECKPOINT_FILE.exists():
+        CHECKPOINT_FILE.unlink()  # Finished - next run starts from the beginning
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate AI key features for active products")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="AI requests in flight")
+    parser.add_argument("--resume", action="store_true", help=f"Continue from the checkpoint in {CHECKPOINT_FILE}")
+    parser.add_argument("--dry-run", action="store_true", help="Use a fake provider and write nothing")
+    parser.add_argument("--fake-products", type=int, default=0, help="Dry run over N synthetic products instead of the database")
+    parser.add_argument("--fake-latency", type=float, default=0.2, help="Seconds per fake AI call")
+    args = parser.parse_args()
+
+    asyncio.run(generate_all_features(
+        concurrency=args.concurrency,
+        resume=args.resume,
+        dry_run=args.dry_run,
+        fake_products=args.fake_products,
+        fake_latency=args.fake_latency
+    ))
 
 
 if __name__ == "__main__":
-    asyncio.run(generate_all_features())
\ No newline at end of file
+    main()
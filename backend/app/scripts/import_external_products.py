@@ -1,71 +1,93 @@
 """
 Import products from external fake APIs for testing
+
+Fetches all sources concurrently, dedupes in memory against one bulk load of
+existing products, and bulk-upserts on a natural key (products.external_key),
+so re-running the import is safe.
+
+Run with: python -m app.scripts.import_external_products
+Offline:  python -m app.scripts.import_external_products --fixtures app/scripts/fixtures/external_products --dry-run
 """
 
-import sys
+import argparse
+import asyncio
+import json
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
-import asyncio
-import requests
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import Product
-import uuid
-
-def fetch_fake_store_products():
-    """Fetch ALL products from Fake Store API"""
-    try:
-        print("  Attempting Fake Store API...")
-        response = requests.get('https://fakestoreapi.com/products', timeout=10)
-        if response.status_code == 200:
-            products = response.json()
-            print(f"  ✅ Got {len(products)} products from Fake Store API")
-            return products
-    except Exception as e:
-        print(f"  ⚠️  Fake Store API failed: {str(e)}")
-    return []
+import httpx
 
-def fetch_platzi_products():
-    """Fetch products from Platzi Fake Store API"""
-    try:
-        print("  Attempting Platzi Fake Store API...")
-        response = requests.get('https://api.escuelajs.co/api/v1/products?limit=100', timeout=10)
-        if response.status_code == 200:
-            products = response.json()
-            print(f"  ✅ Got {len(products)} products from Platzi API")
-            return products
-    except Exception as e:
-        print(f"  ⚠️  Platzi API failed: {str(e)}")
-    return []
+# source -> (url, key holding the product list or None, max products)
+SOURCES = {
+    'fake-store': ('https://fakestoreapi.com/products', None, None),
+    'platzi': ('https://api.escuelajs.co/api/v1/products?limit=100', None, None),
+    'makeup': ('http://makeup-api.herokuapp.com/api/v1/products.json', None, 100),  # Limit to avoid overwhelming database
+    'dummyjson': ('https://dummyjson.com/products?limit=100', 'products', None),
+}
+
+FETCH_TIMEOUT = 15.0
+UPSERT_BATCH_SIZE = 500
+UPSERT_CONCURRENCY = 4
+LOAD_PAGE_SIZE = 1000
+
+# Variation templates for different categories
+VARIATION_TEMPLATES = {
+    'dog': [
+        ('food', 'Premium Dog Food'),
+        ('toys', 'Dog Play Toy'),
+        ('grooming', 'Dog Grooming Care'),
+    ],
+    'cat': [
+        ('food', 'Premium Cat Food'),
+        ('toys', 'Cat Play Toy'),
+        ('litter', 'Cat Care Product'),
+    ],
+    'baby': [
+        ('care', 'Baby Care Product'),
+        ('formula', 'Baby Nutrition'),
+        ('toys', 'Baby Development Toy'),
+    ],
+    'human': [
+        ('skincare', 'Skincare Solution'),
+        ('supplements', 'Health Supplement'),
+        ('shoes', 'Premium Footwear'),
+        ('personal_care', 'Personal Care'),
+    ]
+}
 
-def fetch_makeup_products():
-    """Fetch beauty products from Makeup API"""
-    try:
-        print("  Attempting Makeup API...")
-        response = requests.get('http://makeup-api.herokuapp.com/api/v1/products.json', timeout=15)
-        if response.status_code == 200:
-            products = response.json()
-            # Limit to first 100 to avoid overwhelming database
-            products = products[:100]
-            print(f"  ✅ Got {len(products)} products from Makeup API")
-            return products
-    except Exception as e:
-        print(f"  ⚠️  Makeup API failed: {str(e)}")
-    return []
 
-def fetch_dummyjson_products():
-    """Fetch products from DummyJSON"""
+async def fetch_source(client: httpx.AsyncClient, source: str, fixtures_dir: Optional[Path] = None) -> List[Dict]:
+    """Fetch one source's products, from the API or from <fixtures_dir>/<source>.json"""
+    url, list_key, max_products = SOURCES[source]
     try:
-        print("  Attempting DummyJSON...")
-        response = requests.get('https://dummyjson.com/products?limit=100', timeout=10)
-        if response.status_code == 200:
-            products = response.json()['products']
-            print(f"  ✅ Got {len(products)} products from DummyJSON")
-            return products
+        if fixtures_dir:
+            payload = json.loads((fixtures_dir / f"{source}.json").read_text())
+        else:
+            response = await client.get(url)
+            response.raise_for_status()
+            payload = response.json()
+
+        products = payload[list_key] if list_key else payload
+        if max_products:
+            products = products[:max_products]
+        print(f"  ✅ Got {len(products)} products from {source}")
+        return products
     except Exception as e:
-        print(f"  ⚠️  DummyJSON failed: {str(e)}")
-    return []
+        print(f"  ⚠️  {source} failed: {str(e)}")
+        return []
+
+
+async def fetch_all(fixtures_dir: Optional[Path] = None) -> List[Tuple[str, Dict]]:
+    """Fetch every source concurrently; a failing source is skipped"""
+    async with httpx.AsyncClient(timeout=FETCH_TIMEOUT, follow_redirects=True) as client:
+        results = await asyncio.gather(*(
+            fetch_source(client, source, fixtures_dir) for source in SOURCES
+        ))
+    return [(source, product) for source, products in zip(SOURCES, results) for product in products]
+
 
 def normalize_product_data(product, source):
     """Normalize product data from different API structures"""
@@ -95,7 +117,7 @@ def normalize_product_data(product, source):
             rating_value = float(rating.get('rate', 4.5))
         else:
             rating_value = float(rating) if rating else 4.5
-            
+
         return {
             'title': product.get('title') or product.get('name', 'Unknown'),
             'description': product.get('description', ''),
@@ -106,20 +128,21 @@ def normalize_product_data(product, source):
             'rating': rating_value
         }
 
+
 def create_product_attributes(profile_category: str, product_category: str, base_title: str) -> dict:
     """Create realistic product attributes based on category"""
     attributes = {
         'external_source': 'fake_api',
         'base_product': base_title
     }
-    
+
     # DOG/CAT ATTRIBUTES
     if profile_category in ['dog', 'cat']:
         attributes.update({
             'life_stage': ['adult', 'all_life_stages'],
             'size_suitability': ['all_sizes'],
         })
-        
+
         if product_category == 'food':
             attributes.update({
                 'primary_protein': 'chicken',
@@ -138,19 +161,19 @@ def create_product_attributes(profile_category: str, product_category: str, base
                 'material': 'durable rubber/fabric',
                 'features': ['interactive', 'safe materials']
             })
-    
+
     # BABY ATTRIBUTES
     elif profile_category == 'baby':
         attributes.update({
             'age_range': '0-12 months',
             'hypoallergenic': True,
         })
-        
+
         if product_category == 'care':
             attributes.update({
                 'features': ['tear-free', 'gentle', 'pediatrician tested']
             })
-    
+
     # HUMAN ATTRIBUTES
     elif profile_category == 'human':
         if product_category == 'skincare':
@@ -169,153 +192,179 @@ def create_product_attributes(profile_category: str, product_category: str, base
                 'material': 'synthetic/leather',
                 'sizes_available': ['6-12']
             })
-    
+
     return attributes
 
-async def import_products():
+
+def external_key(source: str, ext_product: Dict, normalized: Dict, profile_category: str) -> str:
+    """Natural key of one variant: source, the source's own ID (or title), profile category"""
+    source_id = ext_product.get('id') or normalized['title']
+    return f"{source}:{source_id}:{profile_category}"[:255]
+
+
+def build_variants(source: str, ext_product: Dict) -> List[Dict]:
+    """One product row per profile category for an external product"""
+    normalized = normalize_product_data(ext_product, source)
+    base_title = normalized['title'][:50]
+    rows = []
+
+    for prof_cat, variations in VARIATION_TEMPLATES.items():
+        # Stable across runs (built-in hash() is salted per process)
+        prod_cat, name_prefix = variations[zlib.crc32(normalized['title'].encode()) % len(variations)]
+        variant_title = f"{name_prefix} - {base_title}"
+
+        # Adjust price based on category
+        variant_price = normalized['price']
+        if prof_cat in ['dog', 'cat']:
+            variant_price = max(variant_price * 1.2, 9.99)
+        elif prof_cat == 'baby':
+            variant_price = max(variant_price * 1.5, 12.99)
+        else:
+            variant_price = max(variant_price, 5.99)
+
+        attributes = create_product_attributes(prof_cat, prod_cat, base_title)
+        attributes['original_category'] = normalized['category']
+        attributes['api_source'] = source
+
+        variant_desc = normalized['description'][:200] if normalized['description'] else f'Premium {prod_cat} product for {prof_cat}s'
+
+        rows.append({
+            'external_key': external_key(source, ext_product, normalized, prof_cat),
+            'name': variant_title[:200],
+            'brand': (normalized['brand'] or 'Premium')[:50],
+            'description': variant_desc[:500],
+            'price': round(variant_price, 2),
+            'price_unit': 'each',
+            'image_url': normalized['image'][:500] if normalized['image'] else '',
+            'rating': normalized['rating'],
+            'pet_type': prof_cat,
+            'product_category': prod_cat,
+            'attributes': attributes,
+            'is_active': True
+        })
+
+    return rows
+
+
+def load_existing_keys(db) -> Tuple[Set[str], Set[str]]:
+    """One paged scan of existing product names and external keys"""
+    names, keys = set(), set()
+    start = 0
+    while True:
+        response = db.table('products').select('name,external_key')\
+            .order('id')\
+            .range(start, start + LOAD_PAGE_SIZE - 1)\
+            .execute()
+        for row in response.data:
+            names.add(row['name'])
+            if row.get('external_key'):
+                keys.add(row['external_key'])
+        if len(response.data) < LOAD_PAGE_SIZE:
+            return names, keys
+        start += LOAD_PAGE_SIZE
+
+
+def dedupe(rows: List[Dict], existing_names: Set[str], existing_keys: Set[str]) -> Tuple[List[Dict], int]:
+    """Drop rows already in the catalog or repeated within this import. Returns (new_rows, skipped)"""
+    new_rows = []
+    seen_names, seen_keys = set(existing_names), set(existing_keys)
+    for row in rows:
+        # Name check covers products imported before external_key existed
+        if row['external_key'] in seen_keys or row['name'] in seen_names:
+            continue
+        seen_keys.add(row['external_key'])
+        seen_names.add(row['name'])
+        new_rows.append(row)
+    return new_rows, len(rows) - len(new_rows)
+
+
+async def upsert_rows(db, rows: List[Dict]) -> int:
+    """Bulk upsert in batches, a few in flight at once. Returns rows written"""
+    batches = [rows[i:i + UPSERT_BATCH_SIZE] for i in range(0, len(rows), UPSERT_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(UPSERT_CONCURRENCY)
+    written = 0
+    started = time.perf_counter()
+
+    def write(batch: List[Dict]) -> int:
+        # ON CONFLICT (external_key) DO NOTHING - a concurrent or repeated run can't duplicate rows
+        response = db.table('products')\
+            .upsert(batch, on_conflict='external_key', ignore_duplicates=True)\
+            .execute()
+        return len(response.data or [])
+
+    async def run(batch: List[Dict]):
+        nonlocal written
+        async with semaphore:
+            count = await asyncio.to_thread(write, batch)
+            written += count
+            elapsed = time.perf_counter() - started
+            print(f"  ✅ Upserted {written}/{len(rows)} products ({written / elapsed:.0f} rows/s)")
+
+    await asyncio.gather(*(run(batch) for batch in batches))
+    return written
+
+
+async def import_products(fixtures_dir: Optional[Path] = None, dry_run: bool = False):
     """Import products from multiple external APIs with variations"""
-    db: Session = SessionLocal()
-    
-    try:
-        print("🌐 Fetching products from multiple external sources...\n")
-        
-        all_external_products = []
-        
-        # Try all APIs
-        apis = [
-            ('fake-store', fetch_fake_store_products()),
-            ('platzi', fetch_platzi_products()),
-            ('makeup', fetch_makeup_products()),
-            ('dummyjson', fetch_dummyjson_products()),
-        ]
-        
-        for source, products in apis:
-            if products:
-                for product in products:
-                    product['_source'] = source
-                all_external_products.extend(products)
-        
-        if len(all_external_products) == 0:
-            print("❌ No products fetched from any API. Check your internet connection.")
-            return
-        
-        print(f"\n📦 Processing {len(all_external_products)} external products...")
-        print("🎯 Creating variations across dog, cat, baby, human categories\n")
-        
-        imported_count = 0
-        skipped_count = 0
-        category_stats = {'dog': 0, 'cat': 0, 'baby': 0, 'human': 0}
-        
-        # Variation templates for different categories
-        variation_templates = {
-            'dog': [
-                ('food', 'Premium Dog Food'),
-                ('toys', 'Dog Play Toy'),
-                ('grooming', 'Dog Grooming Care'),
-            ],
-            'cat': [
-                ('food', 'Premium Cat Food'),
-                ('toys', 'Cat Play Toy'),
-                ('litter', 'Cat Care Product'),
-            ],
-            'baby': [
-                ('care', 'Baby Care Product'),
-                ('formula', 'Baby Nutrition'),
-                ('toys', 'Baby Development Toy'),
-            ],
-            'human': [
-                ('skincare', 'Skincare Solution'),
-                ('supplements', 'Health Supplement'),
-                ('shoes', 'Premium Footwear'),
-                ('personal_care', 'Personal Care'),
-            ]
-        }
-        
-        # Process each product
-        for ext_product in all_external_products:
-            try:
-                source = ext_product.get('_source', 'unknown')
-                normalized = normalize_product_data(ext_product, source)
-                
-                # Create 1 variation per category (4 total per product)
-                for prof_cat, variations in variation_templates.items():
-                    # Pick one variation randomly based on product
-                    prod_cat, name_prefix = variations[hash(normalized['title']) % len(variations)]
-                    
-                    # Create unique product name
-                    base_title = normalized['title'][:50]
-                    variant_title = f"{name_prefix} - {base_title}"
-                    
-                    # Check if product already exists
-                    existing = db.query(Product).filter(Product.name == variant_title).first()
-                    if existing:
-                        skipped_count += 1
-                        continue
-                    
-                    # Adjust price based on category
-                    variant_price = normalized['price']
-                    if prof_cat in ['dog', 'cat']:
-                        variant_price = max(variant_price * 1.2, 9.99)
-                    elif prof_cat == 'baby':
-                        variant_price = max(variant_price * 1.5, 12.99)
-                    else:
-                        variant_price = max(variant_price, 5.99)
-                    
-                    # Create attributes
-                    attributes = create_product_attributes(prof_cat, prod_cat, base_title)
-                    attributes['original_category'] = normalized['category']
-                    attributes['api_source'] = source
-                    
-                    # Create description
-                    variant_desc = normalized['description'][:200] if normalized['description'] else f'Premium {prod_cat} product for {prof_cat}s'
-                    
-                    # Create new product
-                    product = Product(
-                        id=uuid.uuid4(),
-                        name=variant_title[:200],
-                        brand=normalized['brand'][:50],
-                        description=variant_desc[:500],
-                        price=round(variant_price, 2),
-                        price_unit='each',
-                        image_url=normalized['image'][:500] if normalized['image'] else '',
-                        rating=normalized['rating'],
-                        pet_type=prof_cat,
-                        product_category=prod_cat,
-                        attributes=attributes,
-                        is_active=True
-                    )
-                    
-                    db.add(product)
-                    imported_count += 1
-                    category_stats[prof_cat] += 1
-                    
-                    if imported_count % 50 == 0:
-                        print(f"  ✅ Imported {imported_count} products...")
-                        db.commit()  # Batch commit
-                
-            except Exception as e:
-                print(f"  ⚠️  Error processing product: {str(e)}")
-                continue
-        
-        db.commit()
-        
-        print(f"\n🎉 Successfully imported {imported_count} new products!")
-        print(f"⏭️  Skipped {skipped_count} duplicates\n")
-        
-        print("📊 Products by category:")
-        for cat, count in category_stats.items():
-            print(f"  • {cat.capitalize()}: {count} products")
-        
-        print(f"\n💡 From {len(all_external_products)} base products, created {imported_count} variations")
-        
-    except Exception as e:
-        db.rollback()
-        print(f"❌ Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise
-    finally:
-        db.close()
+    started = time.perf_counter()
+    print("🌐 Fetching products from multiple external sources...\n")
+
+    all_external_products = await fetch_all(fixtures_dir)
+    if len(all_external_products) == 0:
+        print("❌ No products fetched from any API. Check your internet connection.")
+        return
+
+    fetched_at = time.perf_counter()
+    print(f"\n📦 Processing {len(all_external_products)} external products ({fetched_at - started:.1f}s to fetch)...")
+    print("🎯 Creating variations across dog, cat, baby, human categories\n")
+
+    rows = []
+    for source, ext_product in all_external_products:
+        try:
+            rows.extend(build_variants(source, ext_product))
+        except Exception as e:
+            print(f"  ⚠️  Error processing product: {str(e)}")
+
+    if dry_run:
+        existing_names, existing_keys = set(), set()
+    else:
+        from app.database import supabase
+        existing_names, existing_keys = load_existing_keys(supabase)
+        print(f"  📚 Loaded {len(existing_keys)} external keys and {len(existing_names)} names from the catalog")
+
+    new_rows, skipped_count = dedupe(rows, existing_names, existing_keys)
+
+    if dry_run:
+        imported_count = len(new_rows)
+        print("  🧪 Dry run - nothing written")
+    else:
+        imported_count = await upsert_rows(supabase, new_rows)
+
+    category_stats = {cat: 0 for cat in VARIATION_TEMPLATES}
+    for row in new_rows:
+        category_stats[row['pet_type']] += 1
+
+    elapsed = time.perf_counter() - started
+    verb = "Would import" if dry_run else "Successfully imported"
+    print(f"\n🎉 {verb} {imported_count} new products in {elapsed:.1f}s!")
+    print(f"⏭️  Skipped {skipped_count} duplicates\n")
+
+    print("📊 Products by category:")
+    for cat, count in category_stats.items():
+        print(f"  • {cat.capitalize()}: {count} products")
+
+    print(f"\n💡 From {len(all_external_products)} base products, created {len(rows)} variations")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import products from external fake APIs")
+    parser.add_argument("--fixtures", type=Path, default=os.getenv("IMPORT_FIXTURES_DIR"),
+                        help="Read <source>.json files from this directory instead of calling the APIs")
+    parser.add_argument("--dry-run", action="store_true", help="Fetch and dedupe without touching the database")
+    args = parser.parse_args()
+
+    asyncio.run(import_products(fixtures_dir=args.fixtures, dry_run=args.dry_run))
+
 
 if __name__ == "__main__":
-    asyncio.run(import_products())
\ No newline at end of file
+    main()
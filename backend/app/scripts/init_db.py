@@ -84,9 +84,30 @@ CREATE TABLE IF NOT EXISTS products (
     product_category VARCHAR(50),
     attributes JSONB DEFAULT '{}'::jsonb,
     is_active BOOLEAN DEFAULT true,
+    external_key VARCHAR(255),
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Natural key for imported products (source:source_id:pet_type), for existing databases too
+ALTER TABLE products ADD COLUMN IF NOT EXISTS external_key VARCHAR(255);
+
+-- AI key features for product cards, kept out of attributes so writes don't rewrite the JSONB
+ALTER TABLE products ADD COLUMN IF NOT EXISTS key_features JSONB;
+UPDATE products SET key_features = attributes->'ai_key_features'
+WHERE key_features IS NULL AND attributes ? 'ai_key_features';
+
+-- Bulk key_features write used by generate_product_features
+CREATE OR REPLACE FUNCTION set_product_key_features(updates JSONB)
+RETURNS INTEGER AS $$
+    WITH updated AS (
+        UPDATE products p SET key_features = u.features
+        FROM jsonb_to_recordset(updates) AS u(id UUID, features JSONB)
+        WHERE p.id = u.id
+        RETURNING 1
+    )
+    SELECT count(*)::int FROM updated;
+$$ LANGUAGE sql;
+
 -- Recommendations table
 CREATE TABLE IF NOT EXISTS recommendations (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -115,6 +136,8 @@ CREATE TABLE IF NOT EXISTS wishlists (
 CREATE INDEX IF NOT EXISTS idx_profiles_user ON profiles(user_id);
 CREATE INDEX IF NOT EXISTS idx_products_category ON products(pet_type, product_category);
 CREATE INDEX IF NOT EXISTS idx_products_active ON products(is_active);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_external_key ON products(external_key);
+CREATE INDEX IF NOT EXISTS idx_products_keyset ON products(pet_type, product_category, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_recommendations_profile ON recommendations(profile_id);
 CREATE INDEX IF NOT EXISTS idx_recommendations_product ON recommendations(product_id);
 CREATE INDEX IF NOT EXISTS idx_wishlists_user ON wishlists(user_id);
@@ -0,0 +1,94 @@
+"""
+Send the recommendation email campaign to every active user
+Uses each profile's cached recommended_product_ids (no AI calls).
+Run with: python -m app.scripts.run_recommendation_campaign --campaign-id weekly-2024-06-03
+
+Re-running with the same --campaign-id resumes: users already emailed are skipped,
+failed deliveries are retried.
+
+Fully offline: python -m app.scripts.run_recommendation_campaign --sink --fake-users 5000
+(--sink starts the local aiosmtpd sink and points SMTP at it; --fake-users replaces the database)
+"""
+
+import argparse
+import asyncio
+import os
+import uuid
+from datetime import date
+from typing import AsyncIterator, Dict, List
+
+from app.scripts.benchmark_email_render import make_products
+from app.services.campaign_service import CAMPAIGN_PAGE_SIZE, RecommendationCampaign
+
+SINK_PORT = 1025
+
+
+class FakeCampaignSource:
+    """Synthetic users sharing a small product set, for offline runs"""
+
+    def __init__(self, users: int, page_size: int = CAMPAIGN_PAGE_SIZE):
+        self.users = users
+        self.page_size = page_size
+        self.products = make_products(20)
+
+    async def pages(self) -> AsyncIterator[List[Dict]]:
+        # Stable IDs so a re-run resumes
+        namespace = uuid.UUID(int=0)
+        for start in range(0, self.users, self.page_size):
+            yield [{
+                "user": {
+                    "id": str(uuid.uuid5(namespace, str(i))),
+                    "email": f"user{i}@example.com",
+                    "full_name": f"User {i}"
+                },
+                "products": [self.products[(i + k) % len(self.products)] for k in range(5)]
+            } for i in range(start, min(start + self.page_size, self.users))]
+
+
+async def run_campaign(campaign_id: str, fake_users: int = 0):
+    from app.services.email_service import EmailQueue
+
+    if fake_users:
+        source = FakeCampaignSource(fake_users)
+    else:
+        from app.database import supabase
+        from app.services.campaign_service import SupabaseCampaignSource
+        source = SupabaseCampaignSource(supabase)
+
+    email_queue = EmailQueue()
+    print(f"📣 Running campaign {campaign_id}")
+    stats = await RecommendationCampaign(campaign_id, source, email_queue).run()
+    await email_queue.stop()
+
+    print(f"\n🎉 Campaign {campaign_id} finished in {stats['seconds']}s")
+    print(f"  ✅ Sent: {stats['sent']}")
+    print(f"  ❌ Failed: {stats['failed']} (re-run with the same --campaign-id to retry)")
+    print(f"  ⏭️  Skipped: {stats['skipped']} without recommendations, {stats['already_done']} from earlier runs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send the recommendation email campaign")
+    parser.add_argument("--campaign-id", default=f"recommendations-{date.today().isoformat()}")
+    parser.add_argument("--sink", action="store_true", help="Deliver to a local SMTP sink instead of SMTP_HOST")
+    parser.add_argument("--fake-users", type=int, default=0, help="Use N synthetic users instead of the database")
+    args = parser.parse_args()
+
+    if not args.sink:
+        asyncio.run(run_campaign(args.campaign_id, args.fake_users))
+        return
+
+    from app.scripts.smtp_sink import SMTPSink
+
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(SINK_PORT),
+        "SMTP_STARTTLS": "false",
+        "SMTP_AUTH": "false",
+    })
+    with SMTPSink(port=SINK_PORT) as sink:
+        asyncio.run(run_campaign(args.campaign_id, args.fake_users))
+        print(f"📬 Sink received {len(sink.messages)} messages over {sink.sessions} SMTP sessions")
+
+
+if __name__ == "__main__":
+    main()
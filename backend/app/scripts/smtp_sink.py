@@ -0,0 +1,105 @@
+"""
+Local SMTP sink for testing email delivery offline (aiosmtpd)
+Accepts every message and keeps it in memory; nothing leaves the machine.
+
+Run with: python -m app.scripts.smtp_sink [--port 1025]
+Then point the app at it: SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=false SMTP_AUTH=false
+
+Self-test: python -m app.scripts.smtp_sink --send 2000
+Pushes messages through EmailQueue into the sink and reports throughput.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+from aiosmtpd.controller import Controller
+
+
+class SMTPSink:
+    """aiosmtpd server on a background thread that records envelopes"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1025, fail_rcpt: Optional[str] = None):
+        self.messages: List = []
+        self.sessions = 0
+        self.fail_rcpt = fail_rcpt  # Refuse this recipient, to exercise error handling
+        self.controller = Controller(self, hostname=host, port=port)
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if self.fail_rcpt and address == self.fail_rcpt:
+            return "550 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+    def start(self) -> "SMTPSink":
+        self.controller.start()
+        return self
+
+    def stop(self) -> None:
+        self.controller.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+async def self_test(count: int, port: int) -> None:
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(port),
+        "SMTP_STARTTLS": "false",
+        "SMTP_AUTH": "false",
+    })
+    from app.services.email_service import EmailQueue, EmailService, SMTPConnectionPool
+
+    pool = SMTPConnectionPool("127.0.0.1", port, starttls=False)
+    email_queue = EmailQueue(EmailService(pool=pool))
+
+    started = time.perf_counter()
+    for i in range(count):
+        email_queue.enqueue(f"user{i}@example.com", "Sink self-test", f"<p>Message {i}</p>")
+    await email_queue.stop()
+    elapsed = time.perf_counter() - started
+
+    print(f"📨 Sent {email_queue.sent} messages ({email_queue.failed} failed) in {elapsed:.2f}s "
+          f"- {email_queue.sent / elapsed:.0f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--send", type=int, default=0, help="Send N messages through EmailQueue and exit")
+    args = parser.parse_args()
+
+    with SMTPSink(port=args.port) as sink:
+        if args.send:
+            asyncio.run(self_test(args.send, args.port))
+            print(f"📬 Sink received {len(sink.messages)} messages over {sink.sessions} SMTP sessions")
+            return
+
+        print(f"📬 SMTP sink listening on 127.0.0.1:{args.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                count = len(sink.messages)
+                time.sleep(5)
+                if len(sink.messages) != count:
+                    print(f"  {len(sink.messages)} messages received")
+        except KeyboardInterrupt:
+            print(f"\n👋 Received {len(sink.messages)} messages over {sink.sessions} SMTP sessions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Fast JSON serialization for API responses (orjson)
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for types orjson doesn't handle natively"""
+    if isinstance(obj, BaseModel):
+        # Python-mode dump - orjson encodes the UUIDs/datetimes inside it natively
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content (including already-validated Pydantic models) to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    orjson response that also accepts Pydantic models.
+    Returning one of these from a route skips FastAPI's response_model
+    re-validation, so models built by our services are validated only once.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
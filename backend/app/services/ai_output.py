@@ -0,0 +1,110 @@
+"""
+AI Output - JSON structured outputs from the LLM providers
+Pydantic models describing what each prompt asks for, and a tolerant parser
+that also copes with code fences, chatter around the object and output cut
+off by max_tokens.
+"""
+
+import json
+import re
+from typing import Any, Dict, List
+
+from pydantic import BaseModel, Field, ValidationError, ValidationInfo, field_validator
+
+_decoder = json.JSONDecoder()
+
+# A key with no value yet at the end of truncated output: {"a": "x", "b"
+_DANGLING_KEY = re.compile(r'(?<=[{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+
+
+class InvalidOutput(ValueError):
+    """The model's reply isn't usable - not JSON, or not the shape we asked for"""
+
+
+def _clean_items(items: List[str]) -> List[str]:
+    return [item.strip() for item in items if item and item.strip()]
+
+
+class RecommendationOutput(BaseModel):
+    explanation: str = Field(min_length=1)
+    pros: List[str] = Field(min_length=1)
+    cons: List[str] = []
+    match_score: int = Field(ge=0, le=100)
+
+    _clean = field_validator("pros", "cons")(_clean_items)
+
+
+class ComparisonOutput(BaseModel):
+    summary: str = Field(min_length=1)
+    best_choice: int  # 1-based PRODUCT number from the prompt
+
+    @field_validator("best_choice")
+    @classmethod
+    def _in_range(cls, value: int, info: ValidationInfo) -> int:
+        count = (info.context or {}).get("product_count")
+        if count and not 1 <= value <= count:
+            raise ValueError(f"must be a product number from 1 to {count}")
+        return value
+
+
+class KeyFeaturesOutput(BaseModel):
+    features: List[str] = Field(min_length=1)
+
+    _clean = field_validator("features")(_clean_items)
+
+
+def _close_truncated(text: str) -> str:
+    """Close the strings, arrays and objects left open when the output was cut off"""
+    stack = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text += '"'
+    if stack and stack[-1] == "}":
+        text = _DANGLING_KEY.sub("", text)
+    text = text.rstrip().rstrip(",:")
+    return text + "".join(reversed(stack))
+
+
+def parse_json_object(text: str) -> Dict[str, Any]:
+    """First JSON object in a model reply, repairing output truncated by max_tokens"""
+    start = (text or "").find("{")
+    if start < 0:
+        raise InvalidOutput("reply contains no JSON object")
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+    except json.JSONDecodeError:
+        try:
+            value = json.loads(_close_truncated(text[start:].strip().removesuffix("```")))
+        except json.JSONDecodeError as e:
+            raise InvalidOutput(f"malformed JSON: {e.msg}")
+    if not isinstance(value, dict):
+        raise InvalidOutput("reply is not a JSON object")
+    return value
+
+
+def validate_output(text: str, model: type, context: Dict = None) -> BaseModel:
+    """Parse and validate a reply; InvalidOutput carries a short reason for a retry prompt"""
+    data = parse_json_object(text)
+    try:
+        return model.model_validate(data, context=context)
+    except ValidationError as e:
+        reasons = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'reply'}: {error['msg']}"
+            for error in e.errors()[:3]
+        )
+        raise InvalidOutput(reasons)
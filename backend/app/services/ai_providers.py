@@ -0,0 +1,298 @@
+"""
+AI Providers - one adapter per LLM provider behind a common blocking complete() call
+Plus the per-provider circuit breaker and the call metrics used by AIService
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+
+class ProviderUnavailable(Exception):
+    """The provider's circuit is open - calls fail fast until it cools down"""
+
+
+# ============================================
+# PROVIDER ADAPTERS
+# ============================================
+
+class BaseProvider:
+    """complete() blocks; AIService runs it in a thread with a deadline"""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def complete(self, system: str, prompt: str, max_tokens: int, temperature: float, timeout: float,
+                 json_mode: bool = False) -> str:
+        """json_mode asks the provider to reply with a single JSON object"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release the SDK's HTTP connection pool"""
+        client = getattr(self, "client", None)
+        if client is not None and hasattr(client, "close"):
+            client.close()
+
+
+class OpenAIProvider(BaseProvider):
+    name = "openai"
+
+    def __init__(self):
+        from openai import OpenAI
+
+        super().__init__(os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+        # Retries are ours (with the call deadline in mind), not the SDK's
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+    def complete(self, system, prompt, max_tokens, temperature, timeout, json_mode=False):
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            **extra
+        )
+        return response.choices[0].message.content
+
+
+class GroqProvider(OpenAIProvider):
+    name = "groq"
+
+    def __init__(self):
+        try:
+            from groq import Groq
+        except ImportError:
+            raise ImportError("groq package not installed. Run: pip install groq")
+
+        BaseProvider.__init__(self, os.getenv("GROQ_MODEL", "llama-3.1-70b-versatile"))
+        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+
+
+class AnthropicProvider(BaseProvider):
+    name = "anthropic"
+
+    def __init__(self):
+        from anthropic import Anthropic
+
+        super().__init__(os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022"))
+        self.client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+
+    def complete(self, system, prompt, max_tokens, temperature, timeout, json_mode=False):
+        messages = [{"role": "user", "content": prompt}]
+        if json_mode:
+            # No JSON mode - prefilling the reply with "{" keeps it to the object
+            messages.append({"role": "assistant", "content": "{"})
+        response = self.client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=messages,
+            temperature=temperature,
+            timeout=timeout
+        )
+        text = response.content[0].text
+        return "{" + text if json_mode else text
+
+
+class OllamaProvider(BaseProvider):
+    name = "ollama"
+
+    def __init__(self):
+        try:
+            import ollama
+        except ImportError:
+            raise ImportError("ollama package not installed. Run: pip install ollama")
+
+        super().__init__(os.getenv("OLLAMA_MODEL", "llama3.1:8b"))
+        self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        self._ollama = ollama
+        self._clients: Dict[float, object] = {}  # The timeout is fixed per client
+
+    def complete(self, system, prompt, max_tokens, temperature, timeout, json_mode=False):
+        # Round so the cached clients stay few
+        timeout = max(1.0, round(timeout))
+        client = self._clients.get(timeout)
+        if client is None:
+            client = self._clients[timeout] = self._ollama.Client(host=self.base_url, timeout=timeout)
+        response = client.chat(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            options={"temperature": temperature, "num_predict": max_tokens},
+            **({"format": "json"} if json_mode else {})
+        )
+        return response['message']['content']
+
+
+PROVIDERS = {
+    "openai": OpenAIProvider,
+    "groq": GroqProvider,
+    "anthropic": AnthropicProvider,
+    "ollama": OllamaProvider,
+}
+
+
+def create_provider(name: str) -> BaseProvider:
+    if name not in PROVIDERS:
+        raise ValueError(f"Unsupported AI provider: {name}")
+    return PROVIDERS[name]()
+
+
+def is_transient(error: Exception) -> bool:
+    """Timeouts, connection errors, 408/429 and 5xx are worth retrying; bad requests and auth are not"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    name = type(error).__name__
+    return any(marker in name for marker in ("Timeout", "Connection", "RateLimit", "Overloaded", "ServiceUnavailable"))
+
+
+# ============================================
+# CIRCUIT BREAKER
+# ============================================
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; while open, calls fail immediately.
+    After `reset_seconds` one trial call is let through (half-open) - success closes it.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """A call was abandoned without an outcome - let another trial through"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Process-wide breaker per provider"""
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(
+            threshold=int(os.getenv("AI_BREAKER_THRESHOLD", "5")),
+            reset_seconds=float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+        )
+    return _breakers[provider]
+
+
+# ============================================
+# METRICS
+# ============================================
+
+class AIMetrics:
+    """Per (provider, operation) counters; fallbacks are counted apart from real results"""
+
+    FIELDS = ("calls", "successes", "fallbacks", "retries", "timeouts", "errors", "short_circuited",
+              "rate_limited", "failovers", "hedges", "hedge_wins", "invalid_outputs", "output_retries")
+    LATENCY_WINDOW = 200  # Recent successes kept per key for the p95
+    MIN_P95_SAMPLES = 20
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._latencies: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, provider: str, operation: str) -> Dict[str, float]:
+        key = (provider, operation)
+        if key not in self._counters:
+            self._counters[key] = {field: 0 for field in self.FIELDS}
+            self._counters[key].update(latency_ms_total=0.0, prompt_tokens=0, completion_tokens=0)
+        return self._counters[key]
+
+    def incr(self, provider: str, operation: str, field: str, amount: int = 1) -> None:
+        with self._lock:
+            self._entry(provider, operation)[field] += amount
+
+    def record_success(self, provider: str, operation: str, latency_ms: float,
+                       prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        """A completed call, with its (estimated) prompt and completion tokens"""
+        with self._lock:
+            entry = self._entry(provider, operation)
+            entry["successes"] += 1
+            entry["latency_ms_total"] += latency_ms
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            self._latencies.setdefault((provider, operation), deque(maxlen=self.LATENCY_WINDOW)).append(latency_ms)
+
+    def p95(self, provider: str, operation: str) -> Optional[float]:
+        """p95 of recent successful call latencies in ms, None until there are enough samples"""
+        with self._lock:
+            samples = sorted(self._latencies.get((provider, operation), ()))
+        if len(samples) < self.MIN_P95_SAMPLES:
+            return None
+        return samples[int(len(samples) * 0.95) - 1]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            result = {}
+            for (provider, operation), entry in self._counters.items():
+                stats = {field: entry[field] for field in self.FIELDS}
+                stats["avg_latency_ms"] = round(entry["latency_ms_total"] / entry["successes"], 1) if entry["successes"] else None
+                stats["prompt_tokens"] = entry["prompt_tokens"]
+                stats["completion_tokens"] = entry["completion_tokens"]
+                stats["avg_tokens_per_call"] = round(
+                    (entry["prompt_tokens"] + entry["completion_tokens"]) / entry["successes"]
+                ) if entry["successes"] else None
+                samples = sorted(self._latencies.get((provider, operation), ()))
+                stats["p95_latency_ms"] = round(samples[int(len(samples) * 0.95) - 1], 1) if len(samples) >= self.MIN_P95_SAMPLES else None
+                result.setdefault(provider, {})[operation] = stats
+            breakers = {name: breaker.state for name, breaker in _breakers.items()}
+        return {"providers": result, "circuit_breakers": breakers}
+
+
+ai_metrics = AIMetrics()
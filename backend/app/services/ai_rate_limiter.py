@@ -0,0 +1,155 @@
+"""
+AI Rate Limiter - client-side request and token budgets per provider/model
+Keeps us just under the provider's RPM/TPM limits so bursts queue here instead
+of coming back as 429s. Waiters are served by priority: interactive requests
+go ahead of batch jobs such as generate_product_features.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+# Priorities - lower is served first
+INTERACTIVE = 0
+BATCH = 1
+
+# (requests per minute, tokens per minute) we allow ourselves; 0 = unlimited
+PROVIDER_LIMITS = {
+    "groq": (30, 6000),        # Free tier
+    "anthropic": (50, 40000),
+    "openai": (500, 200000),
+    "ollama": (0, 0),          # Local - concurrency is the only limit
+    "fake": (0, 0),
+}
+
+
+class TokenBudgetLimiter:
+    """
+    Two token buckets (requests and LLM tokens), each refilling at its per-minute
+    rate with a minute's worth of burst. acquire() waits in a priority queue.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._waiters = []  # heap of (priority, seq, tokens, future)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rpm <= 0 and self.tpm <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        if self.rpm > 0:
+            self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / 60)
+        if self.tpm > 0:
+            self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / 60)
+
+    def _wait_time(self, tokens: int) -> float:
+        """Seconds until both buckets can cover one request of `tokens`"""
+        wait = 0.0
+        if self.rpm > 0 and self._requests < 1:
+            wait = (1 - self._requests) * 60 / self.rpm
+        if self.tpm > 0 and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+        return wait
+
+    def _dispatch(self) -> None:
+        """Grant waiters in priority order while the budget lasts, then sleep until the head fits"""
+        self._timer = None
+        self._refill()
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():  # Cancelled or timed out while queued
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._wait_time(tokens)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            if self.rpm > 0:
+                self._requests -= 1
+            if self.tpm > 0:
+                self._tokens -= tokens
+            future.set_result(None)
+
+    async def acquire(self, tokens: int, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> float:
+        """
+        Wait for budget for one request of about `tokens` (prompt + max completion).
+        Returns the seconds spent waiting; raises TimeoutError after `timeout`.
+        """
+        if self.unlimited:
+            return 0.0
+        if self.tpm > 0:
+            tokens = min(tokens, self.tpm)  # A request bigger than the bucket would wait forever
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Scripts may run several event loops in turn; waiters never outlive theirs
+            self._loop, self._waiters, self._timer = loop, [], None
+
+        started = time.monotonic()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, future))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException:
+            # Gave up while queued - whoever is behind may fit now
+            if self._timer is not None:
+                self._timer.cancel()
+            self._dispatch()
+            raise
+        return time.monotonic() - started
+
+    def refund(self, tokens: int) -> None:
+        """Give back the part of a reservation the completion didn't use"""
+        if self.tpm > 0 and tokens > 0:
+            self._refill()
+            self._tokens = min(float(self.tpm), self._tokens + tokens)
+
+    def snapshot(self) -> Dict:
+        self._refill()
+        return {
+            "requests_per_minute": self.rpm,
+            "tokens_per_minute": self.tpm,
+            "requests_available": round(self._requests, 1) if self.rpm > 0 else None,
+            "tokens_available": round(self._tokens) if self.tpm > 0 else None,
+            "queued": sum(1 for *_, future in self._waiters if not future.done())
+        }
+
+
+_limiters: Dict[Tuple[str, str], TokenBudgetLimiter] = {}
+
+
+def get_limiter(provider: str, model: str) -> TokenBudgetLimiter:
+    """
+    Process-wide limiter per provider/model
+    Override the defaults with AI_<PROVIDER>_RPM / AI_<PROVIDER>_TPM (e.g. AI_GROQ_TPM=20000).
+    """
+    key = (provider, model)
+    if key not in _limiters:
+        rpm, tpm = PROVIDER_LIMITS.get(provider, (60, 0))
+        prefix = f"AI_{provider.upper()}"
+        _limiters[key] = TokenBudgetLimiter(
+            requests_per_minute=int(os.getenv(f"{prefix}_RPM", rpm)),
+            tokens_per_minute=int(os.getenv(f"{prefix}_TPM", tpm))
+        )
+    return _limiters[key]
+
+
+def limiter_snapshot() -> Dict:
+    return {f"{provider}/{model}": limiter.snapshot() for (provider, model), limiter in _limiters.items()}
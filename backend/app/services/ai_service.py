@@ -1,43 +1,281 @@
 """
-AI Service - Multi-Provider Support (OpenAI, Anthropic, Ollama)
+AI Service - Multi-Provider Support (OpenAI, Anthropic, Groq, Ollama)
+Provider calls go through the adapters in ai_providers with a per-call deadline,
+jittered retries for transient errors and a per-provider circuit breaker, failing
+over to AI_FALLBACK_PROVIDERS and optionally hedging slow requests.
 """
 
+import asyncio
 import os
-from typing import Dict, List, Optional
-from openai import OpenAI
-from anthropic import Anthropic
-try:
-    from groq import Groq
-except ImportError:
-    Groq = None
-try:
-    import ollama
-except ImportError:
-    ollama = None
-    
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.services.ai_output import (
+    ComparisonOutput, InvalidOutput, KeyFeaturesOutput, RecommendationOutput, validate_output
+)
+from app.services.ai_providers import ProviderUnavailable, ai_metrics, create_provider, get_breaker, is_transient
+from app.services.ai_rate_limiter import BATCH, INTERACTIVE, get_limiter
+from app.services.ai_tokens import estimate_tokens
+
+# Whole-call budget, retries included - a slow provider fails fast instead of holding the request
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "20"))
+AI_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("AI_ATTEMPT_TIMEOUT_SECONDS", "8"))  # Leaves room for a retry
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))
+AI_MIN_ATTEMPT_SECONDS = 1.0  # Not worth starting an attempt with less time than this left
+# Part of the budget the primary leaves unused so a failover provider still gets a go
+AI_FAILOVER_RESERVE_SECONDS = float(os.getenv("AI_FAILOVER_RESERVE_SECONDS", "8"))
+# Hedging: "" (off), a fixed delay in ms, or "auto" for the primary's recent p95 latency
+AI_HEDGE_AFTER_MS = os.getenv("AI_HEDGE_AFTER_MS", "").strip().lower()
+
+# Static instructions, sent as the system prompt - identical on every call, so
+# providers with prompt caching can reuse them; per-call data stays in the user prompt
+RECOMMENDATION_INSTRUCTIONS = (
+    "Rate how well the product suits the profile, putting allergies and health conditions first. "
+    'Reply with only JSON: {"explanation": "2-3 sentences", "pros": [up to 3 short benefits], '
+    '"cons": [up to 2 short concerns], "match_score": 0-100}'
+)
+COMPARISON_INSTRUCTIONS = (
+    "Compare the numbered products for the profile on safety, fit and value. "
+    'Reply with only JSON: {"summary": "3-4 sentences naming the best choice and why", "best_choice": product number}'
+)
+KEY_FEATURES_INSTRUCTIONS = (
+    "Write 2 short selling features (under 8 words each) for the product card. "
+    'Reply with only JSON: {"features": ["...", "..."]}'
+)
+PROMPT_MAX_INGREDIENTS = 6  # The first few ingredients carry the signal
+PROMPT_MAX_DESCRIPTION_CHARS = 160
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Cut at a word boundary"""
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
 
 class AIService:
     def __init__(self):
         self.provider = os.getenv("AI_PROVIDER", "groq").lower()
-        if self.provider == "openai":
-            self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            self.model = "gpt-4o-mini"
-        elif self.provider == "anthropic":
-            self.client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-            self.model = "claude-3-5-sonnet-20241022"
-        elif self.provider == "ollama":
-            self.client = None
-            self.model = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
-            self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-            print(f"✅ Using LOCAL Ollama model: {self.model}")
-        elif self.provider == "groq":
-            if Groq is None:
-                raise ImportError("groq package not installed. Run: pip install groq")
-            self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-            self.model = os.getenv("GROQ_MODEL", "llama-3.1-70b-versatile")
-            print(f"✅ Using Groq (FREE): {self.model}")
-        else:
-            raise ValueError(f"Unsupported AI provider: {self.provider}")
+        self.client = create_provider(self.provider)
+        self.model = self.client.model
+        print(f"✅ Using {self.provider}: {self.model}")
+        
+        # Tried in order when the primary fails (e.g. AI_FALLBACK_PROVIDERS=ollama)
+        self.fallback_clients = []
+        for name in os.getenv("AI_FALLBACK_PROVIDERS", "").lower().split(","):
+            name = name.strip()
+            if not name or name == self.provider:
+                continue
+            try:
+                self.fallback_clients.append(create_provider(name))
+                print(f"✅ Failover provider: {name}")
+            except Exception as e:
+                print(f"⚠️  Failover provider {name} unavailable: {str(e)}")
+    
+    def _hedge_delay(self, operation: str) -> Optional[float]:
+        """Seconds to wait on the first request before hedging, None when hedging is off"""
+        if AI_HEDGE_AFTER_MS == "auto":
+            p95_ms = ai_metrics.p95(self.provider, operation)
+            return p95_ms / 1000 if p95_ms is not None else None
+        if AI_HEDGE_AFTER_MS:
+            return float(AI_HEDGE_AFTER_MS) / 1000
+        return None
+    
+    async def _complete(
+        self,
+        operation: str,
+        system: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float = 0.7,
+        priority: int = INTERACTIVE,
+        json_mode: bool = False
+    ) -> Tuple[str, str]:
+        """
+        Run one completion within AI_TIMEOUT_SECONDS. The primary provider is tried
+        first, then each failover provider. With hedging on, a second request is
+        started if the first hasn't answered in time, and the first success wins.
+        Returns (content, name of the provider that answered).
+        Raises when every provider fails - callers decide on a fallback.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + AI_TIMEOUT_SECONDS
+        hedge_after = self._hedge_delay(operation)
+        
+        # (client, hedge_only) - with no failover provider, the hedge goes to the primary again
+        queue = [(client, False) for client in [self.client] + self.fallback_clients]
+        if hedge_after is not None and len(queue) == 1:
+            queue.append((self.client, True))
+        
+        tasks = {}
+        
+        def start(hedge: bool):
+            client, _ = queue.pop(0)
+            # Keep some of the budget for the providers still queued
+            end = deadline - AI_FAILOVER_RESERVE_SECONDS if any(not h for _, h in queue) else deadline
+            task = asyncio.create_task(self._call_provider(
+                client, operation, system, prompt, max_tokens, temperature, end, priority, json_mode
+            ))
+            tasks[task] = (client, hedge)
+            return client
+        
+        start(hedge=False)
+        hedged = False
+        last_error = None
+        try:
+            while tasks:
+                wait_for_hedge = hedge_after if (not hedged and queue) else None
+                done, _ = await asyncio.wait(tasks, timeout=wait_for_hedge, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    # Counted under the provider the hedge request goes to
+                    ai_metrics.incr(start(hedge=True).name, operation, "hedges")
+                    continue
+                
+                for task in done:
+                    client, hedge = tasks.pop(task)
+                    try:
+                        content = task.result()
+                    except Exception as e:
+                        last_error, failed_client = e, client
+                        continue
+                    if hedge:
+                        ai_metrics.incr(client.name, operation, "hedge_wins")
+                    return content, client.name
+                
+                # Everything in flight failed - fail over to the next real provider
+                queue[:] = [(client, h) for client, h in queue if not h]
+                if not tasks and queue:
+                    print(f"↪️  {operation} failing over to {queue[0][0].name} ({type(last_error).__name__})")
+                    # Counted under the provider that failed, not the one taking over
+                    ai_metrics.incr(failed_client.name, operation, "failovers")
+                    start(hedge=False)
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _call_provider(
+        self,
+        client,
+        operation: str,
+        system: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        deadline: float,
+        priority: int = INTERACTIVE,
+        json_mode: bool = False
+    ) -> str:
+        """
+        One provider, attempts capped at AI_ATTEMPT_TIMEOUT_SECONDS, transient errors
+        retried with full-jitter backoff until the deadline (event loop time).
+        Each attempt first waits for the provider's request/token budget; batch
+        callers don't count that wait against the deadline, interactive ones do.
+        """
+        name = client.name
+        breaker = get_breaker(name)
+        ai_metrics.incr(name, operation, "calls")
+        if not breaker.allow():
+            ai_metrics.incr(name, operation, "short_circuited")
+            raise ProviderUnavailable(f"{name} circuit is open")
+        
+        limiter = get_limiter(name, client.model)
+        prompt_tokens = estimate_tokens(system) + estimate_tokens(prompt)
+        reserved = prompt_tokens + max_tokens
+        
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    waited = await limiter.acquire(
+                        reserved, priority, timeout=None if priority == BATCH else deadline - loop.time()
+                    )
+                except TimeoutError:
+                    breaker.release()
+                    ai_metrics.incr(name, operation, "rate_limited")
+                    raise ProviderUnavailable(f"{name} request budget exhausted")
+                if priority == BATCH:
+                    deadline += waited
+                
+                remaining = min(deadline - loop.time(), AI_ATTEMPT_TIMEOUT_SECONDS)
+                started = time.perf_counter()
+                try:
+                    # SDK calls block - run them off the event loop; the SDK gets the same timeout
+                    content = await asyncio.wait_for(
+                        asyncio.to_thread(
+                            client.complete, system, prompt, max_tokens, temperature, remaining, json_mode
+                        ),
+                        timeout=remaining
+                    )
+                except Exception as e:
+                    if isinstance(e, TimeoutError):
+                        ai_metrics.incr(name, operation, "timeouts")
+                    if not is_transient(e):
+                        # The provider answered - it's the request that's bad, not the provider
+                        breaker.record_success()
+                        ai_metrics.incr(name, operation, "errors")
+                        raise
+                
+                    delay = random.uniform(0, AI_RETRY_BASE_DELAY * 2 ** attempt)
+                    if attempt >= AI_MAX_RETRIES or deadline - loop.time() - delay < AI_MIN_ATTEMPT_SECONDS:
+                        breaker.record_failure()
+                        ai_metrics.incr(name, operation, "errors")
+                        raise
+                
+                    attempt += 1
+                    ai_metrics.incr(name, operation, "retries")
+                    print(f"🔁 {name} {operation} attempt {attempt} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+            
+                breaker.record_success()
+                completion_tokens = estimate_tokens(content)
+                ai_metrics.record_success(
+                    name, operation, (time.perf_counter() - started) * 1000, prompt_tokens, completion_tokens
+                )
+                limiter.refund(max_tokens - completion_tokens)
+                return content
+        except asyncio.CancelledError:
+            # Lost a hedge race or the caller gave up - says nothing about the provider
+            breaker.release()
+            raise
+    
+    async def _complete_json(
+        self,
+        operation: str,
+        system: str,
+        prompt: str,
+        output_model: type,
+        max_tokens: int,
+        priority: int = INTERACTIVE,
+        context: Optional[Dict] = None
+    ):
+        """
+        Completion in the provider's JSON mode, validated against output_model.
+        A malformed or off-schema reply gets one retry that names what was wrong.
+        """
+        # Output problems are counted under the provider that produced the reply
+        content, provider = await self._complete(operation, system, prompt, max_tokens, priority=priority, json_mode=True)
+        try:
+            return validate_output(content, output_model, context)
+        except InvalidOutput as e:
+            ai_metrics.incr(provider, operation, "invalid_outputs")
+            print(f"⚠️  Invalid {operation} output ({str(e)}), retrying once")
+            reason = str(e)
+        
+        ai_metrics.incr(provider, operation, "output_retries")
+        retry_prompt = f"{prompt}\n\nYour previous reply could not be used ({reason[:200]}). Reply with only the corrected JSON object."
+        content, provider = await self._complete(operation, system, retry_prompt, max_tokens, priority=priority, json_mode=True)
+        try:
+            return validate_output(content, output_model, context)
+        except InvalidOutput:
+            ai_metrics.incr(provider, operation, "invalid_outputs")
+            raise
     
     def _get_expert_role(self, profile_category: str) -> str:
         """Get expert role description based on profile category"""
@@ -78,393 +316,178 @@ class AIService:
         }
         return labels.get(profile_category, "profile")
     
+    def _system_prompt(self, instructions: str, profile_category: str) -> str:
+        """Static instructions first (a shared prefix providers can cache), then the expert role"""
+        return f"{instructions}\nExpertise: {self._get_expert_role(profile_category)}."
+    
     async def generate_product_recommendation(
         self,
         profile: Dict,
-        product: Dict
+        product: Dict,
+        priority: int = INTERACTIVE
     ) -> Dict[str, any]:
-        """Generate personalized recommendation for a specific product"""
+        """
+        Generate personalized recommendation for a specific product
+        Fallback results carry is_fallback=True so callers don't cache them.
+        """
         profile_category = profile.get('profile_category') or profile.get('pet_type', 'dog')
-        expert_role = self._get_expert_role(profile_category)
         prompt = self._build_recommendation_prompt(profile, product)
         
         try:
-            if self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": f"You are a {expert_role} providing personalized recommendations."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=500
-                )
-                content = response.choices[0].message.content
-            
-            elif self.provider == "anthropic":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=500,
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7
-                )
-                content = response.content[0].text
-            
-            elif self.provider == "ollama":
-                # LOCAL LLM - FREE!
-                response = ollama.chat(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"You are a {expert_role} providing personalized recommendations."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    options={
-                        "temperature": 0.7,
-                        "num_predict": 500
-                    }
-                )
-                content = response['message']['content']
-            elif self.provider == "groq":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": f"You are a {expert_role} providing personalized recommendations."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=500
-                )
-                content = response.choices[0].message.content
-            
-            return self._parse_recommendation_response(content)
+            output = await self._complete_json(
+                "recommendation",
+                self._system_prompt(RECOMMENDATION_INSTRUCTIONS, profile_category),
+                prompt,
+                RecommendationOutput,
+                max_tokens=300,
+                priority=priority
+            )
+            return output.model_dump()
         
         except Exception as e:
-            print(f"AI Error ({self.provider}): {str(e)}")
+            print(f"AI Error ({self.provider}): {type(e).__name__}: {str(e)}")
+            ai_metrics.incr(self.provider, "recommendation", "fallbacks")
             return self._generate_fallback_recommendation(profile, product)
     
     async def generate_comparison_summary(
         self,
         profile: Dict,
         products: List[Dict],
-        recommendations: List[Dict]
+        recommendations: List[Dict],
+        priority: int = INTERACTIVE
     ) -> Dict[str, any]:
         """Generate AI comparison summary for multiple products"""
         profile_category = profile.get('profile_category') or profile.get('pet_type', 'dog')
-        expert_role = self._get_expert_role(profile_category)
         prompt = self._build_comparison_prompt(profile, products, recommendations)
         
         try:
-            if self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": f"You are a {expert_role} comparing products."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=400
-                )
-                content = response.choices[0].message.content
-            
-            elif self.provider == "anthropic":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=400,
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7
-                )
-                content = response.content[0].text
-            
-            elif self.provider == "ollama":
-                # LOCAL LLM
-                response = ollama.chat(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"You are a {expert_role} comparing products."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    options={
-                        "temperature": 0.7,
-                        "num_predict": 400
-                    }
-                )
-                content = response['message']['content']
-            elif self.provider == "groq":
-                # Groq - FREE & FAST!
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": f"You are a {expert_role} comparing products."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=400
-                )
-                content = response.choices[0].message.content
-            
-            return self._parse_comparison_response(content, products)
+            output = await self._complete_json(
+                "comparison",
+                self._system_prompt(COMPARISON_INSTRUCTIONS, profile_category),
+                prompt,
+                ComparisonOutput,
+                max_tokens=250,
+                priority=priority,
+                context={"product_count": len(products)}
+            )
+            return {
+                "summary": output.summary,
+                "best_choice_id": str(products[output.best_choice - 1]["id"])
+            }
         
         except Exception as e:
-            print(f"AI Error ({self.provider}): {str(e)}")
+            print(f"AI Error ({self.provider}): {type(e).__name__}: {str(e)}")
+            ai_metrics.incr(self.provider, "comparison", "fallbacks")
             return {
                 "summary": "All products meet basic safety requirements. Choose based on your budget and preferences.",
-                "best_choice_id": str(products[0]["id"]) if products else None
+                "best_choice_id": str(products[0]["id"]) if products else None,
+                "is_fallback": True
             }
     
-    def _build_recommendation_prompt(self, profile: Dict, product: Dict) -> str:
-        """Build prompt for single product recommendation"""
+    def _profile_line(self, profile: Dict, with_conditions: bool = True) -> str:
+        """One compact line describing a profile; empty fields are left out"""
         profile_category = profile.get('profile_category') or profile.get('pet_type', 'dog')
-        product_type_label = self._get_product_type_label(profile_category)
-        profile_type_label = self._get_profile_type_label(profile_category)
-        
-        allergies_str = ", ".join(profile.get("allergies", [])) or "none"
-        health_conditions_str = ", ".join(profile.get("health_conditions", [])) or "none"
-        
-        attributes = product.get("attributes", {})
-        ingredients = attributes.get("ingredients", {})
-        nutrition = attributes.get("nutrition", {})
-        
-        # Build profile-specific details
-        profile_details = f"""- Name: {profile['name']}
-- Category: {profile_category}, Age: {profile['age_years']} years"""
-        
+        parts = [profile['name'], self._get_profile_type_label(profile_category), f"{profile['age_years']}y"]
         if profile.get('weight_lbs'):
-            profile_details += f"\n- Weight: {profile['weight_lbs']} lbs"
-        
+            parts.append(f"{profile['weight_lbs']} lbs")
         if profile.get('size_category'):
-            profile_details += f", Size: {profile.get('size_category')}"
-        
-        profile_details += f"""
-- Allergies: {allergies_str}
-- Health Conditions: {health_conditions_str}"""
-        
-        # Build product details
-        product_details = f"""- Name: {product['name']}
-- Brand: {product['brand']}"""
+            parts.append(profile['size_category'])
+        # Always stated, so "none" is explicit rather than unknown
+        parts.append(f"allergies: {', '.join(profile.get('allergies') or []) or 'none'}")
+        if with_conditions and profile.get('health_conditions'):
+            parts.append(f"conditions: {', '.join(profile['health_conditions'])}")
+        return "Profile: " + "; ".join(parts)
+    
+    def _build_recommendation_prompt(self, profile: Dict, product: Dict) -> str:
+        """Compact prompt for single product recommendation - instructions live in the system prompt"""
+        attributes = product.get("attributes") or {}
+        ingredients = attributes.get("ingredients") or {}
+        nutrition = attributes.get("nutrition") or {}
         
+        parts = [f"{product['name']} by {product['brand']}"]
         if attributes.get('primary_protein'):
-            product_details += f"\n- Primary Protein: {attributes.get('primary_protein')}"
-        
-        if ingredients.get('full_list'):
-            product_details += f"\n- Ingredients: {', '.join(ingredients.get('full_list', [])[:10])}"
-        
-        if ingredients.get('allergens'):
-            product_details += f"\n- Allergens: {', '.join(ingredients.get('allergens', []))}"
-        
-        if nutrition:
-            if nutrition.get('protein_pct'):
-                product_details += f"\n- Protein: {nutrition.get('protein_pct')}%"
+            parts.append(f"protein source: {attributes['primary_protein']}")
+        if nutrition.get('protein_pct'):
+            macros = f"{nutrition['protein_pct']}% protein"
             if nutrition.get('fat_pct'):
-                product_details += f", Fat: {nutrition.get('fat_pct')}%"
-        
+                macros += f", {nutrition['fat_pct']}% fat"
+            parts.append(macros)
+        if ingredients.get('allergens'):
+            parts.append(f"allergens: {', '.join(ingredients['allergens'])}")
         if attributes.get('life_stage'):
-            product_details += f"\n- Life Stage: {', '.join(attributes.get('life_stage', []))}"
-        
+            parts.append(f"life stage: {', '.join(attributes['life_stage'])}")
         if attributes.get('size_suitability'):
-            product_details += f"\n- Size Suitability: {', '.join(attributes.get('size_suitability', []))}"
+            parts.append(f"sizes: {', '.join(attributes['size_suitability'])}")
         
-        return f"""Analyze this {product_type_label} for a specific {profile_type_label} profile and provide a recommendation.
-
-PROFILE:
-{profile_details}
-
-PRODUCT:
-{product_details}
-
-Provide your analysis in this EXACT format:
-
-EXPLANATION: [2-3 sentences explaining why this product is or isn't suitable for this specific {profile_type_label}]
-
-PROS:
-- [Benefit 1]
-- [Benefit 2]
-- [Benefit 3]
-
-CONS:
-- [Consideration 1]
-- [Consideration 2]
-
-MATCH_SCORE: [0-100]"""
+        lines = [self._profile_line(profile), "Product: " + "; ".join(parts)]
+        if ingredients.get('full_list'):
+            lines.append(f"Ingredients: {', '.join(ingredients['full_list'][:PROMPT_MAX_INGREDIENTS])}")
+        return "\n".join(lines)
     
     def _build_comparison_prompt(self, profile: Dict, products: List[Dict], recommendations: List[Dict]) -> str:
-        """Build prompt for product comparison"""
-        profile_category = profile.get('profile_category') or profile.get('pet_type', 'dog')
-        product_type_label = self._get_product_type_label(profile_category)
-        profile_type_label = self._get_profile_type_label(profile_category)
-        
-        allergies_str = ", ".join(profile.get("allergies", [])) or "none"
-        
-        # Build profile description
-        profile_desc = f"{profile['age_years']}-year-old"
-        if profile.get('size_category'):
-            profile_desc += f" {profile.get('size_category')}"
-        profile_desc += f" {profile_type_label} named {profile['name']}"
-        
-        products_summary = "\n\n".join([
-            f"PRODUCT {i+1}: {p['name']} by {p['brand']}\n"
-            f"- Price: ${p['price']}\n"
-            f"- Match Score: {r['match_score']}/100\n"
-            f"- Key Pros: {', '.join(r['pros'][:2]) if r['pros'] else 'N/A'}\n"
-            f"- Key Cons: {', '.join(r['cons'][:2]) if r['cons'] else 'N/A'}"
-            for i, (p, r) in enumerate(zip(products, recommendations))
-        ])
-        
-        return f"""Compare these {product_type_label}s for a {profile_desc} with allergies to {allergies_str}.
-
-{products_summary}
-
-Provide a 3-4 sentence comparison summary explaining which product is the best choice for THIS specific {profile_type_label} and why. Consider safety, nutritional fit, and value. End with: "BEST_CHOICE: [Product Name]" """
-    
-    def _parse_recommendation_response(self, content: str) -> Dict:
-        """Parse AI response into structured format"""
-        lines = content.strip().split("\n")
-        result = {
-            "explanation": "",
-            "pros": [],
-            "cons": [],
-            "match_score": 75
-        }
-        
-        section = None
-        for line in lines:
-            line = line.strip()
-            if line.startswith("EXPLANATION:"):
-                result["explanation"] = line.replace("EXPLANATION:", "").strip()
-                section = "explanation"
-            elif line == "PROS:":
-                section = "pros"
-            elif line == "CONS:":
-                section = "cons"
-            elif line.startswith("MATCH_SCORE:"):
-                try:
-                    result["match_score"] = int(line.split(":")[1].strip())
-                except:
-                    pass
-            elif line.startswith("-") and section in ["pros", "cons"]:
-                result[section].append(line[1:].strip())
-            elif section == "explanation" and line and not line.startswith(("PROS", "CONS", "MATCH")):
-                result["explanation"] += " " + line
-        
-        if not result["explanation"]:
-            result["explanation"] = "This product has been analyzed based on your profile."
-        if not result["pros"]:
-            result["pros"] = ["Meets basic nutritional requirements"]
-        if not result["cons"]:
-            result["cons"] = ["Individual results may vary"]
-        
-        return result
+        """Compact prompt for product comparison - products are numbered for best_choice"""
+        lines = [self._profile_line(profile, with_conditions=False)]
+        for i, (p, r) in enumerate(zip(products, recommendations), 1):
+            line = f"{i}. {p['name']} by {p['brand']}; ${p['price']}; score {r['match_score']}"
+            if r['pros']:
+                line += f"; pros: {', '.join(r['pros'][:2])}"
+            if r['cons']:
+                line += f"; cons: {', '.join(r['cons'][:2])}"
+            lines.append(line)
+        return "\n".join(lines)
     
-    def _parse_comparison_response(self, content: str, products: List[Dict]) -> Dict:
-        """Parse comparison response to extract summary and best choice"""
-        lines = content.strip().split("\n")
-        summary = ""
-        best_choice_id = None
-        
-        for line in lines:
-            if line.strip().startswith("BEST_CHOICE:"):
-                best_choice_name = line.split("BEST_CHOICE:")[1].strip()
-                # Find matching product
-                for product in products:
-                    if product["name"].lower() in best_choice_name.lower():
-                        best_choice_id = product["id"]
-                        break
-            else:
-                summary += line + " "
+    def _build_key_features_prompt(self, product: Dict) -> str:
+        """Compact prompt for product card features"""
+        product_type_label = self._get_product_type_label(product.get('pet_type', 'general'))
+        attributes = product.get("attributes") or {}
+        ingredients = attributes.get("ingredients") or {}
         
-        summary = summary.strip()
-        if not summary:
-            summary = "All products are suitable options. Choose based on your preferences and budget."
+        parts = [f"{product['name']} by {product['brand']} ({product_type_label})"]
+        if attributes.get('primary_protein'):
+            parts.append(f"protein source: {attributes['primary_protein']}")
+        if ingredients.get('full_list'):
+            parts.append(f"ingredients: {', '.join(ingredients['full_list'][:5])}")
         
-        return {
-            "summary": summary,
-            "best_choice_id": best_choice_id or (str(products[0]["id"]) if products else None)
-        }
+        lines = ["Product: " + "; ".join(parts)]
+        if product.get('description'):
+            lines.append(f"Description: {_truncate(product['description'], PROMPT_MAX_DESCRIPTION_CHARS)}")
+        return "\n".join(lines)
     
-    async def generate_product_key_features(self, product: Dict) -> List[str]:
-        """Generate 2 concise key features for a product"""
-        profile_category = product.get('pet_type', 'general')
-        product_type_label = self._get_product_type_label(profile_category)
-        
-        attributes = product.get("attributes", {})
-        ingredients = attributes.get("ingredients", {})
-        
-        prompt = f"""Based on this {product_type_label}, write 2 short selling features:
-
-Product: {product['name']} by {product['brand']}
-Description: {product.get('description', 'N/A')}
-Primary Protein: {attributes.get('primary_protein', 'N/A')}
-Key Ingredients: {', '.join(ingredients.get('full_list', [])[:5])}
-
-Output format (NO additional text, just the features):
-Feature 1 text here
-Feature 2 text here"""
-        
+    async def generate_product_key_features(
+        self,
+        product: Dict,
+        fallback: bool = True,
+        priority: int = INTERACTIVE
+    ) -> List[str]:
+        """
+        Generate 2 concise key features for a product
+        With fallback=False, provider errors are raised instead of returning generic features.
+        """
         try:
-            if self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a product copywriter."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=100
-                )
-                content = response.choices[0].message.content
-            
-            elif self.provider == "anthropic":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=100,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7
-                )
-                content = response.content[0].text
-            
-            elif self.provider == "ollama":
-                response = ollama.chat(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a product copywriter."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    options={"temperature": 0.7, "num_predict": 100}
-                )
-                content = response['message']['content']
-            
-            # Parse features
-            features = [
-            line.strip().lstrip('-•123456789. ') 
-            for line in content.strip().split('\n') 
-            if line.strip() and not any(skip in line.lower() for skip in ['here are', 'feature', 'selling point', 'key point'])
-            ]
-            return features[:2] if features else [
-                f"{product.get('brand', 'Premium')} quality",
-                f"Suitable for {profile_category}s"
-            ]
+            output = await self._complete_json(
+                "key_features",
+                KEY_FEATURES_INSTRUCTIONS,
+                self._build_key_features_prompt(product),
+                KeyFeaturesOutput,
+                max_tokens=80,
+                priority=priority
+            )
+            return output.features[:2]
         
         except Exception as e:
+            if not fallback:
+                raise
             print(f"AI Error generating features: {str(e)}")
-            return [
-                f"{product.get('brand', 'Premium')} quality",
-                f"Suitable for {profile_category}s"
-            ]
+            ai_metrics.incr(self.provider, "key_features", "fallbacks")
+            return self.fallback_key_features(product)
+    
+    @staticmethod
+    def fallback_key_features(product: Dict) -> List[str]:
+        """Generic features used when AI fails (never stored)"""
+        return [
+            f"{product.get('brand', 'Premium')} quality",
+            f"Suitable for {product.get('pet_type', 'general')}s"
+        ]
     
     def _generate_fallback_recommendation(self, profile: Dict, product: Dict) -> Dict:
         """Generate basic recommendation when AI fails"""
@@ -479,5 +502,32 @@ Feature 2 text here"""
                 "Consult with a professional for specific dietary needs",
                 "Individual results may vary"
             ],
-            "match_score": 75
-        }
\ No newline at end of file
+            "match_score": 75,
+            "is_fallback": True
+        }
+
+
+_ai_service: Optional[AIService] = None
+_ai_service_lock = threading.Lock()
+
+
+def get_ai_service() -> AIService:
+    """
+    Process-wide AIService - provider SDK clients (and their HTTP pools) are built once.
+    Created by the app's startup warm-up; scripts get it on first use.
+    """
+    global _ai_service
+    if _ai_service is None:
+        # The warm-up thread and a first request may get here together
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
+    return _ai_service
+
+
+def close_ai_service() -> None:
+    global _ai_service
+    if _ai_service is not None:
+        for client in [_ai_service.client] + _ai_service.fallback_clients:
+            client.close()
+        _ai_service = None
@@ -0,0 +1,41 @@
+"""
+AI Tokens - local token estimates for prompts and completions
+Used for the per-provider token budget and the per-call token accounting in
+/metrics/ai. Providers bill with their own tokenizers; this tracks them closely
+enough for budgeting and for comparing prompt formats.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+# Word pieces, 1-3 digit number chunks and single punctuation marks - roughly how
+# BPE tokenizers split English text (a leading space is folded into the word)
+_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+LETTERS_PER_TOKEN = 6  # Longer words split into several tokens
+
+
+@lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    # Opt-in: tiktoken downloads its encoding on first use
+    if os.getenv("AI_TOKENIZER", "").lower() != "tiktoken":
+        return None
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠️  tiktoken unavailable, using the built-in token estimate: {str(e)}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count for text - tiktoken's cl100k_base when AI_TOKENIZER=tiktoken, else a local estimate"""
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return sum(
+        1 + (len(piece) - 1) // LETTERS_PER_TOKEN if piece[0].isalpha() else 1
+        for piece in _PIECES.findall(text)
+    )
@@ -3,9 +3,8 @@ Authentication Service - Supabase REST API version
 """
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Dict
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from uuid import UUID
 import os
 import uuid as uuid_lib
@@ -14,7 +13,12 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """bcrypt context - passlib and jose (with its crypto backends) load on first use, not at startup"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class AuthService:
@@ -24,15 +28,17 @@ class AuthService:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         password_bytes = plain_password.encode('utf-8')[:72]
-        return pwd_context.verify(password_bytes.decode('utf-8'), hashed_password)
+        return get_pwd_context().verify(password_bytes.decode('utf-8'), hashed_password)
     
     @staticmethod
     def get_password_hash(password: str) -> str:
         password_bytes = password.encode('utf-8')[:72]
-        return pwd_context.hash(password_bytes.decode('utf-8'))
+        return get_pwd_context().hash(password_bytes.decode('utf-8'))
     
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+        from jose import jwt
+        
         to_encode = data.copy()
         if expires_delta:
             expire = datetime.utcnow() + expires_delta
@@ -78,6 +84,8 @@ class AuthService:
     
     @staticmethod
     def decode_token(token: str) -> Optional[dict]:
+        from jose import JWTError, jwt
+        
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             return payload
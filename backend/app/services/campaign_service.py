@@ -0,0 +1,183 @@
+"""
+Campaign Service - recommendation email campaigns across the user base
+Streams users in pages, bulk-loads their profiles' cached recommendations and
+the products behind them, renders a page at a time and hands messages to the
+email queue. Per-user delivery state is appended to a local JSON Lines file,
+so an interrupted campaign resumes without emailing anyone twice.
+"""
+
+import asyncio
+import json
+import os
+import time
+from itertools import zip_longest
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from app.email_templates import MAX_PRODUCTS_PER_EMAIL, render_bulk
+from app.services.email_service import EmailQueue
+
+CAMPAIGN_STATE_DIR = Path(os.getenv("CAMPAIGN_STATE_DIR", ".campaigns"))
+CAMPAIGN_PAGE_SIZE = 500
+CAMPAIGN_MAX_IN_FLIGHT = int(os.getenv("CAMPAIGN_MAX_IN_FLIGHT", "1000"))  # Rendered but not yet delivered
+
+# PostgREST puts in_() filters in the URL - keep ID lists well under its length limit
+IN_FILTER_CHUNK = 200
+
+PRODUCT_EMAIL_COLUMNS = "id,name,brand,price,description"
+
+
+def _chunks(items: List, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def pick_products(id_lists: List[List]) -> List[str]:
+    """Round-robin across a user's profiles so each profile gets a pick before any gets two"""
+    picks = []
+    for round_ids in zip_longest(*id_lists):
+        for pid in round_ids:
+            if pid and str(pid) not in picks:
+                picks.append(str(pid))
+                if len(picks) == MAX_PRODUCTS_PER_EMAIL:
+                    return picks
+    return picks
+
+
+class SupabaseCampaignSource:
+    """Pages of (user, products) pairs straight from the database"""
+
+    def __init__(self, db, page_size: int = CAMPAIGN_PAGE_SIZE):
+        self.db = db  # supabase client
+        self.page_size = page_size
+
+    def _user_page(self, after_id: Optional[str]) -> List[Dict]:
+        query = self.db.table('users').select('id,email,full_name').eq('is_active', True)
+        if after_id:
+            query = query.gt('id', after_id)
+        return query.order('id').limit(self.page_size).execute().data
+
+    def _profiles_for(self, user_ids: List[str]) -> List[Dict]:
+        profiles = []
+        for chunk in _chunks(user_ids, IN_FILTER_CHUNK):
+            profiles.extend(self.db.table('profiles')
+                            .select('user_id,recommended_product_ids')
+                            .in_('user_id', chunk)
+                            .order('created_at')
+                            .execute().data)
+        return profiles
+
+    def _products_for(self, product_ids: List[str]) -> Dict[str, Dict]:
+        products = {}
+        for chunk in _chunks(product_ids, IN_FILTER_CHUNK):
+            for row in self.db.table('products')\
+                    .select(PRODUCT_EMAIL_COLUMNS)\
+                    .in_('id', chunk)\
+                    .eq('is_active', True)\
+                    .execute().data:
+                products[str(row['id'])] = row
+        return products
+
+    async def pages(self) -> AsyncIterator[List[Dict]]:
+        """Yields lists of {"user": ..., "products": [...]}, one list per page of users"""
+        after_id = None
+        while True:
+            users = await asyncio.to_thread(self._user_page, after_id)
+            if not users:
+                return
+            after_id = users[-1]['id']
+
+            user_ids = [str(u['id']) for u in users]
+            profiles = await asyncio.to_thread(self._profiles_for, user_ids)
+
+            id_lists: Dict[str, List[List]] = {uid: [] for uid in user_ids}
+            for profile in profiles:
+                id_lists[str(profile['user_id'])].append(profile.get('recommended_product_ids') or [])
+            picks = {uid: pick_products(lists) for uid, lists in id_lists.items()}
+
+            all_ids = list({pid for ids in picks.values() for pid in ids})
+            products = await asyncio.to_thread(self._products_for, all_ids)
+
+            yield [{
+                "user": user,
+                "products": [products[pid] for pid in picks[str(user['id'])] if pid in products]
+            } for user in users]
+
+
+class RecommendationCampaign:
+    """Renders and enqueues one recommendation email per user, resumable by campaign ID"""
+
+    def __init__(self, campaign_id: str, source, email_queue: Optional[EmailQueue] = None,
+                 max_in_flight: int = CAMPAIGN_MAX_IN_FLIGHT):
+        self.campaign_id = campaign_id
+        self.source = source
+        self.email_queue = email_queue or EmailQueue()
+        self.max_in_flight = max_in_flight
+        self.state_path = CAMPAIGN_STATE_DIR / f"{campaign_id}.jsonl"
+        self.stats = {"sent": 0, "failed": 0, "skipped": 0, "already_done": 0}
+
+    def load_done(self) -> Set[str]:
+        """Users already emailed (or skipped) in an earlier run of this campaign"""
+        done = set()
+        if self.state_path.exists():
+            with self.state_path.open() as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry["status"] in ("sent", "skipped"):
+                        done.add(entry["user_id"])
+                    else:
+                        done.discard(entry["user_id"])
+        return done
+
+    def _record(self, state_file, user_id: str, status: str, error: Optional[str] = None) -> None:
+        self.stats[status] += 1
+        state_file.write(json.dumps({"user_id": user_id, "status": status, "error": error}) + "\n")
+        state_file.flush()
+
+    async def run(self) -> Dict:
+        done = self.load_done()
+        if done:
+            print(f"⏩ Resuming campaign {self.campaign_id}: {len(done)} users already handled")
+
+        CAMPAIGN_STATE_DIR.mkdir(parents=True, exist_ok=True)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        started = time.perf_counter()
+
+        with self.state_path.open("a") as state_file:
+            def on_result(message: Dict, error: Optional[str]) -> None:
+                self._record(state_file, message['metadata']['user_id'], "sent" if error is None else "failed", error)
+                slots.release()
+
+            async for page in self.source.pages():
+                todo = []
+                for item in page:
+                    user_id = str(item["user"]["id"])
+                    if user_id in done:
+                        self.stats["already_done"] += 1
+                    elif not item["products"]:
+                        self._record(state_file, user_id, "skipped", "No cached recommendations")
+                    else:
+                        todo.append(item)
+
+                rendered = render_bulk("recommendations", [{
+                    "user_name": item["user"].get("full_name") or "there",
+                    "products": item["products"]
+                } for item in todo])
+
+                for item, (subject, html) in zip(todo, rendered):
+                    # Backpressure - don't render further ahead than the SMTP workers can send
+                    await slots.acquire()
+                    self.email_queue.enqueue(
+                        item["user"]["email"], subject, html,
+                        on_result=on_result,
+                        metadata={"user_id": str(item["user"]["id"])}
+                    )
+
+                elapsed = time.perf_counter() - started
+                print(f"  📨 {self.stats['sent']} sent, {self.stats['failed']} failed, "
+                      f"{self.stats['skipped']} skipped ({self.stats['sent'] / elapsed:.0f} msg/s)")
+
+            await self.email_queue.join()
+
+        self.stats["seconds"] = round(time.perf_counter() - started, 2)
+        return self.stats
@@ -1,233 +1,350 @@
 """
 Email Service for automated campaigns
 Supports welcome emails, abandoned cart, product recommendations
+
+Delivery goes through a small pool of persistent SMTP connections (STARTTLS and
+login happen once per connection, not per message). Bulk sends go through
+EmailQueue, whose workers send batches of messages per SMTP session with retries.
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import asyncio
+import queue
+import random
 import smtplib
+import threading
+import time
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
 import os
 
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+# Idle connections older than this are checked with NOOP before reuse
+SMTP_IDLE_CHECK_SECONDS = 30
+
+EMAIL_QUEUE_WORKERS = int(os.getenv("EMAIL_QUEUE_WORKERS", "4"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))  # Messages per SMTP session
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "4"))
+EMAIL_RETRY_BASE_DELAY = float(os.getenv("EMAIL_RETRY_BASE_DELAY", "2"))
+
+
+class SMTPConnectionPool:
+    """Persistent, reusable SMTP connections; a broken connection is dropped and reopened"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = "",
+        password: str = "",
+        starttls: bool = True,
+        size: int = SMTP_POOL_SIZE
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.starttls:
+            server.starttls()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        return server
+
+    def _take(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            if time.monotonic() - last_used < SMTP_IDLE_CHECK_SECONDS:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._discard(server)
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a logged-in connection; it goes back to the pool unless the block raised"""
+        with self._slots:
+            server = self._take()
+            try:
+                yield server
+            except Exception:
+                self._discard(server)
+                raise
+            self._idle.put((server, time.monotonic()))
+
+    def close(self) -> None:
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
 
 class EmailService:
-    def __init__(self):
+    def __init__(self, pool: Optional[SMTPConnectionPool] = None):
         self.smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
         self.smtp_user = os.getenv("SMTP_USER", "")
         self.smtp_password = os.getenv("SMTP_PASSWORD", "")
+        # Local sinks/relays (e.g. app.scripts.smtp_sink) run without TLS or login
+        self.smtp_starttls = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+        self.smtp_auth = os.getenv("SMTP_AUTH", "true").lower() == "true"
         self.from_email = os.getenv("FROM_EMAIL", "noreply@aipersona.com")
         self.from_name = os.getenv("FROM_NAME", "AI Persona")
+        self.pool = pool or get_smtp_pool()
+    
+    @property
+    def configured(self) -> bool:
+        return not self.smtp_auth or bool(self.smtp_user and self.smtp_password)
+    
+    def build_message(self, to_email: str, subject: str, html_content: str) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = to_email
         
+        html_part = MIMEText(html_content, 'html')
+        msg.attach(html_part)
+        return msg
+    
+    def send_batch(self, messages: List[Dict]) -> List[Tuple[Dict, Optional[str], bool]]:
+        """
+        Send many messages over one pooled SMTP session.
+        messages: dicts with to, subject, html.
+        Returns (message, error or None, retryable) per message.
+        """
+        results = []
+        remaining = list(messages)
+        try:
+            with self.pool.connection() as server:
+                while remaining:
+                    message = remaining[0]
+                    try:
+                        server.send_message(self.build_message(message['to'], message['subject'], message['html']))
+                        results.append((message, None, False))
+                    except smtplib.SMTPRecipientsRefused as e:
+                        # Bad address - permanent, and the session is still usable
+                        results.append((message, f"Recipient refused: {e.recipients}", False))
+                    except (smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                        # The server answered (and smtplib sent RSET), so only this message failed;
+                        # 4xx replies are temporary, 5xx permanent
+                        results.append((message, f"{type(e).__name__}: {e.smtp_code} {e.smtp_error!r}", 400 <= e.smtp_code < 500))
+                    remaining.pop(0)
+        except (smtplib.SMTPServerDisconnected, OSError) as e:
+            # Connection-level failure (SMTPException is an OSError too) - everything not yet sent failed with it
+            results.extend((message, str(e), True) for message in remaining)
+        return results
+    
     def send_email(self, to_email: str, subject: str, html_content: str) -> bool:
         """Send an email"""
-        try:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-            
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-            
-            # Connect and send
-            if not self.smtp_user or not self.smtp_password:
-                print("⚠️  SMTP credentials not configured, email not sent")
-                return False
-                
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-                
-            print(f"✅ Email sent to {to_email}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Email error: {str(e)}")
+        if not self.configured:
+            print("⚠️  SMTP credentials not configured, email not sent")
             return False
+        
+        message = {'to': to_email, 'subject': subject, 'html': html_content}
+        for _ in range(2):  # A pooled connection may have been dropped by the server - retry once on a fresh one
+            (_, error, retryable), = self.send_batch([message])
+            if error is None:
+                print(f"✅ Email sent to {to_email}")
+                return True
+            if not retryable:
+                break
+        
+        print(f"❌ Email error: {error}")
+        return False
     
     def send_welcome_email(self, user_email: str, user_name: str) -> bool:
         """Send welcome email to new users"""
-        subject = "Welcome to AI Persona! 🎉"
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .content {{ background: #f9fafb; padding: 30px; }}
-                .button {{ display: inline-block; background: #667eea; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; margin: 20px 0; }}
-                .feature {{ background: white; padding: 15px; margin: 15px 0; border-radius: 8px; border-left: 4px solid #667eea; }}
-                .footer {{ text-align: center; padding: 20px; color: #6b7280; font-size: 14px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Welcome to AI Persona! 🎉</h1>
-                </div>
-                <div class="content">
-                    <p>Hi {user_name},</p>
-                    
-                    <p>We're thrilled to have you join AI Persona! Get ready to discover personalized product recommendations powered by artificial intelligence.</p>
-                    
-                    <h2>Here's what you can do:</h2>
-                    
-                    <div class="feature">
-                        <strong>🐾 Create Profiles</strong><br>
-                        Set up profiles for your pets, babies, or family members with specific needs, allergies, and preferences.
-                    </div>
-                    
-                    <div class="feature">
-                        <strong>🤖 AI-Powered Recommendations</strong><br>
-                        Get personalized product matches with detailed AI analysis including pros, cons, and safety warnings.
-                    </div>
-                    
-                    <div class="feature">
-                        <strong>⚖️ Compare Products</strong><br>
-                        Select up to 4 products and compare them side-by-side with AI insights tailored to your profile.
-                    </div>
-                    
-                    <div class="feature">
-                        <strong>❤️ Save Favorites</strong><br>
-                        Build wishlists and save products for later purchase.
-                    </div>
-                    
-                    <div style="text-align: center;">
-                        <a href="https://aipersona.com/profiles" class="button">Create Your First Profile</a>
-                    </div>
-                    
-                    <p>Need help? Check out our <a href="https://aipersona.com/faq">FAQ page</a> or reply to this email.</p>
-                    
-                    <p>Happy shopping!<br>
-                    The AI Persona Team</p>
-                </div>
-                <div class="footer">
-                    © {datetime.now().year} AI Persona. All rights reserved.
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
+        # Templates are compiled on import - loaded on the first email, not at app startup
+        from app.email_templates import render_welcome
+        subject, html_content = render_welcome(user_name)
         return self.send_email(user_email, subject, html_content)
     
     def send_profile_created_email(self, user_email: str, profile_name: str, profile_category: str) -> bool:
         """Send confirmation email when profile is created"""
-        subject = f"Profile Created: {profile_name} 🎯"
-        
-        category_emoji = {
-            'dog': '🐕',
-            'cat': '🐱',
-            'baby': '👶',
-            'human': '👤'
-        }
-        
-        emoji = category_emoji.get(profile_category, '✨')
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #10b981 0%, #059669 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .content {{ background: #f9fafb; padding: 30px; }}
-                .button {{ display: inline-block; background: #10b981; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; margin: 20px 0; }}
-                .footer {{ text-align: center; padding: 20px; color: #6b7280; font-size: 14px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>{emoji} Profile Created!</h1>
-                </div>
-                <div class="content">
-                    <p>Great news!</p>
-                    
-                    <p>Your profile for <strong>{profile_name}</strong> has been successfully created.</p>
-                    
-                    <p>Our AI is now ready to provide personalized {profile_category} product recommendations based on their unique needs and preferences.</p>
-                    
-                    <div style="text-align: center;">
-                        <a href="https://aipersona.com/products" class="button">Browse Personalized Products</a>
-                    </div>
-                    
-                    <p>You can update this profile anytime or create additional profiles for other family members or pets.</p>
-                    
-                    <p>Happy shopping!<br>
-                    The AI Persona Team</p>
-                </div>
-                <div class="footer">
-                    © {datetime.now().year} AI Persona. All rights reserved.
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
+        from app.email_templates import render_profile_created
+        subject, html_content = render_profile_created(profile_name, profile_category)
         return self.send_email(user_email, subject, html_content)
     
     def send_recommendation_email(self, user_email: str, user_name: str, products: List[Dict]) -> bool:
         """Send weekly personalized product recommendations"""
-        subject = "New Products You'll Love! 💝"
-        
-        product_html = ""
-        for product in products[:5]:  # Top 5 products
-            product_html += f"""
-            <div style="background: white; padding: 20px; margin: 15px 0; border-radius: 8px; border: 1px solid #e5e7eb;">
-                <h3 style="margin-top: 0; color: #1f2937;">{product.get('name')}</h3>
-                <p style="color: #6b7280; margin: 5px 0;"><strong>{product.get('brand')}</strong></p>
-                <p style="color: #059669; font-size: 20px; font-weight: bold; margin: 10px 0;">${product.get('price', 0):.2f}</p>
-                <p style="color: #4b5563;">{product.get('description', '')[:150]}...</p>
-                <a href="https://aipersona.com/product/{product.get('id')}" style="display: inline-block; background: #667eea; color: white; padding: 10px 20px; text-decoration: none; border-radius: 6px; margin-top: 10px;">View Product</a>
-            </div>
-            """
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #f59e0b 0%, #d97706 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                .content {{ background: #f9fafb; padding: 30px; }}
-                .footer {{ text-align: center; padding: 20px; color: #6b7280; font-size: 14px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>💝 Personalized Picks for You</h1>
-                </div>
-                <div class="content">
-                    <p>Hi {user_name},</p>
-                    
-                    <p>Based on your profiles and preferences, we've handpicked these products just for you:</p>
-                    
-                    {product_html}
-                    
-                    <p style="text-align: center; margin-top: 30px;">
-                        <a href="https://aipersona.com/products" style="display: inline-block; background: #667eea; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px;">Browse All Products</a>
-                    </p>
-                    
-                    <p>Happy shopping!<br>
-                    The AI Persona Team</p>
-                </div>
-                <div class="footer">
-                    <a href="https://aipersona.com/settings/unsubscribe">Unsubscribe</a> from marketing emails<br>
-                    © {datetime.now().year} AI Persona. All rights reserved.
-                </div>
-            </div>
-        </body>
-        </html>
+        from app.email_templates import render_recommendations
+        subject, html_content = render_recommendations(user_name, products)
+        return self.send_email(user_email, subject, html_content)
+
+
+class EmailQueue:
+    """
+    Async send queue: enqueue() returns immediately, worker tasks send batches
+    over pooled connections and retry failures with exponential backoff
+    """
+
+    def __init__(
+        self,
+        service: Optional[EmailService] = None,
+        workers: int = EMAIL_QUEUE_WORKERS,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        retry_base_delay: float = EMAIL_RETRY_BASE_DELAY
+    ):
+        self.service = service or EmailService()
+        self.worker_count = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.sent = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retries = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def enqueue(self, to_email: str, subject: str, html_content: str, on_result=None, metadata: Optional[Dict] = None) -> None:
         """
-        
-        return self.send_email(user_email, subject, html_content)
\ No newline at end of file
+        Queue a message. on_result(message, error) is called once it is sent (error None)
+        or has failed for good; message['metadata'] carries whatever the caller passed in.
+        """
+        self.start()
+        self._queue.put_nowait({
+            'to': to_email,
+            'subject': subject,
+            'html': html_content,
+            'attempts': 0,
+            'on_result': on_result,
+            'metadata': metadata or {}
+        })
+
+    async def join(self) -> None:
+        """Wait until every queued message (including pending retries) is sent or failed"""
+        if self._queue is None:
+            return
+        while True:
+            await self._queue.join()
+            if not self._retries:
+                return
+            await asyncio.gather(*self._retries, return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Drain the queue, then stop the workers and close pooled connections"""
+        await self.join()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.service.pool.close()
+
+    async def _next_batch(self) -> List[Dict]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                if not self.service.configured:
+                    results = [(message, "SMTP credentials not configured", False) for message in batch]
+                else:
+                    try:
+                        results = await asyncio.to_thread(self.service.send_batch, batch)
+                    except Exception as e:
+                        results = [(message, str(e), True) for message in batch]
+                for message, error, retryable in results:
+                    try:
+                        self._handle_result(message, error, retryable)
+                    except Exception as e:
+                        # A failing on_result callback must not kill the worker (join() would hang)
+                        print(f"⚠️  Email result handler error for {message['to']}: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _handle_result(self, message: Dict, error: Optional[str], retryable: bool) -> None:
+        message['attempts'] += 1
+        if error is None:
+            self.sent += 1
+        elif retryable and message['attempts'] < self.max_attempts:
+            # Exponential backoff with jitter so a flapping server isn't hit in lockstep
+            delay = self.retry_base_delay * (2 ** (message['attempts'] - 1)) * random.uniform(0.5, 1.5)
+            task = asyncio.create_task(self._requeue_later(message, delay))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return
+        else:
+            self.failed += 1
+            print(f"❌ Email to {message['to']} failed after {message['attempts']} attempts: {error}")
+
+        if message['on_result']:
+            message['on_result'](message, error)
+
+    async def _requeue_later(self, message: Dict, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(message)
+
+
+_smtp_pool: Optional[SMTPConnectionPool] = None
+_email_queue: Optional[EmailQueue] = None
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Process-wide SMTP connection pool (created on first use)"""
+    global _smtp_pool
+    if _smtp_pool is None:
+        _smtp_pool = SMTPConnectionPool(
+            host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            user=os.getenv("SMTP_USER", "") if os.getenv("SMTP_AUTH", "true").lower() == "true" else "",
+            password=os.getenv("SMTP_PASSWORD", ""),
+            starttls=os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+        )
+    return _smtp_pool
+
+
+def get_email_queue() -> EmailQueue:
+    """Process-wide email queue; workers start on the first enqueue"""
+    global _email_queue
+    if _email_queue is None:
+        _email_queue = EmailQueue()
+    return _email_queue
+
+
+async def shutdown_email_queue() -> None:
+    """Flush queued mail on shutdown"""
+    if _email_queue is not None and _email_queue.running:
+        await _email_queue.stop()
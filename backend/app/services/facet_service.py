@@ -0,0 +1,248 @@
+"""
+Facet Service - in-memory facet index over the active catalog
+Serves combinable filters (brand, price band, grain-free, life stage,
+allergen-free) and facet counts without pulling the catalog to the browser
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.http_cache import catalog_version
+from app.pagination import encode_cursor, decode_cursor, parse_timestamp
+
+# Rebuild at least this often so writes from other workers/scripts show up
+FACET_INDEX_TTL = int(os.getenv("FACET_INDEX_TTL", "300"))
+
+# (name, lower bound inclusive, upper bound exclusive)
+PRICE_BANDS = [
+    ("under_15", 0, 15),
+    ("15_to_30", 15, 30),
+    ("30_to_60", 30, 60),
+    ("60_plus", 60, None),
+]
+
+# Only the attributes the facets need are read out of the JSONB
+FACET_COLUMNS = (
+    "id,brand,price,pet_type,product_category,created_at,"
+    "grain_free:attributes->grain_free,"
+    "features:attributes->features,"
+    "life_stage:attributes->life_stage,"
+    "allergens:attributes->ingredients->allergens,"
+    "contains:attributes->ingredients->contains"
+)
+
+# Filters handled by the index (pet_type/product_category are handled too, but
+# are also plain column filters)
+FACET_FILTERS = ("brand", "price_band", "grain_free", "life_stage", "exclude_allergen")
+
+
+def price_band(price: Optional[float]) -> Optional[str]:
+    """Name of the price band a price falls into"""
+    if price is None:
+        return None
+    for name, low, high in PRICE_BANDS:
+        if price >= low and (high is None or price < high):
+            return name
+    return None
+
+
+class CatalogFacetIndex:
+    """Posting lists (facet value -> product IDs) built from one catalog scan"""
+
+    def __init__(self, rows: List[Dict]):
+        self.sort_keys: Dict[str, Tuple[datetime, str]] = {}
+        self.postings: Dict[Tuple[str, str], Set[str]] = {}
+        self.values: Dict[str, Dict[str, List[str]]] = {}  # product id -> facet -> values
+
+        for row in rows:
+            self._add(row)
+
+        # Newest first, same order as the product list endpoint
+        self.ordered_ids = sorted(self.sort_keys, key=self.sort_keys.get, reverse=True)
+        self.all_ids = set(self.ordered_ids)
+
+        # Precomputed counts for the unfiltered view of each category
+        self.category_counts: Dict[Tuple[Optional[str], Optional[str]], Dict] = {}
+        for pet_type, product_category in self._category_pairs():
+            base = self.match(pet_type, product_category, {})
+            self.category_counts[(pet_type, product_category)] = self._counts(base, pet_type, product_category, {})
+
+    def _add(self, row: Dict) -> None:
+        pid = str(row['id'])
+        features = [str(f).lower() for f in (row.get('features') or [])]
+        grain_free = bool(row.get('grain_free')) or 'grain_free' in features
+        allergens = {str(a).lower() for a in (row.get('allergens') or []) + (row.get('contains') or [])}
+
+        values = {
+            "pet_type": [row.get('pet_type')],
+            "product_category": [row.get('product_category')],
+            "brand": [row.get('brand')],
+            "price_band": [price_band(row.get('price'))],
+            "grain_free": ["true" if grain_free else "false"],
+            "life_stage": [str(s).lower() for s in (row.get('life_stage') or [])],
+            "allergen": sorted(allergens),
+        }
+        values = {facet: [v for v in vals if v] for facet, vals in values.items()}
+        self.values[pid] = values
+
+        for facet, vals in values.items():
+            for value in vals:
+                self.postings.setdefault((facet, value), set()).add(pid)
+
+        self.sort_keys[pid] = (parse_timestamp(row['created_at']), pid)
+
+    def _category_pairs(self) -> Set[Tuple[Optional[str], Optional[str]]]:
+        pairs = {(None, None)}
+        for vals in self.values.values():
+            pet_type = (vals["pet_type"] or [None])[0]
+            category = (vals["product_category"] or [None])[0]
+            pairs.add((pet_type, None))
+            pairs.add((pet_type, category))
+        return pairs
+
+    def _posting(self, facet: str, value: str) -> Set[str]:
+        return self.postings.get((facet, value), set())
+
+    def match(
+        self,
+        pet_type: Optional[str],
+        product_category: Optional[str],
+        filters: Dict,
+        skip_facet: Optional[str] = None
+    ) -> Set[str]:
+        """Product IDs matching every filter (except skip_facet, for disjunctive counts)"""
+        ids = self.all_ids
+        if pet_type:
+            ids = ids & self._posting("pet_type", pet_type)
+        if product_category:
+            ids = ids & self._posting("product_category", product_category)
+
+        # Multiple values within one facet are OR'ed; facets are AND'ed
+        for facet in ("brand", "price_band", "life_stage"):
+            if filters.get(facet) and facet != skip_facet:
+                ids = ids & set().union(*(self._posting(facet, str(v).lower() if facet == "life_stage" else v)
+                                         for v in filters[facet]))
+
+        if filters.get("grain_free") is not None and skip_facet != "grain_free":
+            ids = ids & self._posting("grain_free", "true" if filters["grain_free"] else "false")
+
+        if filters.get("exclude_allergen") and skip_facet != "exclude_allergen":
+            for allergen in filters["exclude_allergen"]:
+                ids = ids - self._posting("allergen", str(allergen).lower())
+
+        return ids
+
+    def _counts(
+        self,
+        base: Set[str],
+        pet_type: Optional[str],
+        product_category: Optional[str],
+        filters: Dict
+    ) -> Dict:
+        counts = {"total": len(base), "facets": {}}
+
+        # Disjunctive faceting - a facet's own selection doesn't narrow its counts
+        ids = self.match(pet_type, None, filters) if product_category else base
+        counts["facets"]["product_category"] = dict(
+            Counter(v for pid in ids for v in self.values[pid]["product_category"]).most_common()
+        )
+
+        for facet in ("brand", "price_band", "grain_free", "life_stage"):
+            ids = self.match(pet_type, product_category, filters, skip_facet=facet) if filters.get(facet) is not None else base
+            counter = Counter(v for pid in ids for v in self.values[pid][facet])
+            counts["facets"][facet] = dict(counter.most_common())
+
+        ids = self.match(pet_type, product_category, filters, skip_facet="exclude_allergen") if filters.get("exclude_allergen") else base
+        contains = Counter(a for pid in ids for a in self.values[pid]["allergen"])
+        counts["facets"]["allergen_free"] = {allergen: len(ids) - n for allergen, n in sorted(contains.items())}
+        return counts
+
+    def facet_counts(self, pet_type: Optional[str], product_category: Optional[str], filters: Dict) -> Dict:
+        """Total and per-value counts for every facet under the given filters"""
+        if not any(filters.get(f) is not None for f in FACET_FILTERS):
+            cached = self.category_counts.get((pet_type, product_category))
+            if cached is not None:
+                return cached
+        base = self.match(pet_type, product_category, filters)
+        return self._counts(base, pet_type, product_category, filters)
+
+    def page(self, ids: Set[str], limit: int, cursor: Optional[str] = None) -> Tuple[List[str], Optional[str], Optional[str]]:
+        """
+        Keyset-paginate matched IDs newest first, with the same cursors as ProductService.
+        Returns (page_ids, next_cursor, prev_cursor).
+        """
+        ordered = [pid for pid in self.ordered_ids if pid in ids]
+
+        direction = 'next'
+        if cursor:
+            direction, created_at, product_id = decode_cursor(cursor, parts=3)
+            if direction not in ('next', 'prev'):
+                raise ValueError("Invalid cursor")
+            # Aware UTC like the index keys - a naive or offset timestamp must not raise TypeError
+            key = (parse_timestamp(created_at), product_id)
+            if direction == 'next':
+                ordered = [pid for pid in ordered if self.sort_keys[pid] < key]
+            else:
+                ordered = [pid for pid in ordered if self.sort_keys[pid] > key]
+
+        if direction == 'next':
+            page_ids = ordered[:limit]
+            has_more = len(ordered) > limit
+            has_before = bool(cursor)
+        else:
+            page_ids = ordered[-limit:]
+            has_more = True
+            has_before = len(ordered) > limit
+
+        next_cursor = self._cursor('next', page_ids[-1]) if page_ids and has_more else None
+        prev_cursor = self._cursor('prev', page_ids[0]) if page_ids and has_before else None
+        return page_ids, next_cursor, prev_cursor
+
+    def _cursor(self, direction: str, pid: str) -> str:
+        created_at, _ = self.sort_keys[pid]
+        return encode_cursor(direction, created_at.isoformat(), pid)
+
+
+_index: Optional[CatalogFacetIndex] = None
+_index_version: Optional[int] = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _load_catalog(db, page_size: int = 1000) -> List[Dict]:
+    """Scan the active catalog (facet columns only) in PostgREST-sized pages"""
+    rows = []
+    start = 0
+    while True:
+        response = db.table('products').select(FACET_COLUMNS)\
+            .eq('is_active', True)\
+            .order('id')\
+            .range(start, start + page_size - 1)\
+            .execute()
+        rows.extend(response.data)
+        if len(response.data) < page_size:
+            return rows
+        start += page_size
+
+
+def get_facet_index(db) -> CatalogFacetIndex:
+    """Process-wide facet index, rebuilt when the catalog version changes or the TTL expires"""
+    global _index, _index_version, _index_built_at
+
+    with _index_lock:
+        stale = (
+            _index is None
+            or _index_version != catalog_version()
+            or time.monotonic() - _index_built_at > FACET_INDEX_TTL
+        )
+        if stale:
+            started = time.perf_counter()
+            _index = CatalogFacetIndex(_load_catalog(db))
+            _index_version = catalog_version()
+            _index_built_at = time.monotonic()
+            print(f"🔎 Built facet index for {len(_index.all_ids)} products in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return _index
@@ -0,0 +1,161 @@
+"""
+Key Feature Service - AI key features for product cards
+Stored in the dedicated products.key_features column, generated at most once
+at a time per product, and fetched in bulk for grids
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.services.ai_rate_limiter import BATCH, INTERACTIVE
+
+# Columns the generation prompt needs
+FEATURE_SOURCE_COLUMNS = "id,name,brand,description,pet_type,attributes,key_features"
+
+# Background generations running at once per worker (grid requests only schedule them)
+BACKGROUND_CONCURRENCY = int(os.getenv("KEY_FEATURES_BACKGROUND_CONCURRENCY", "4"))
+
+# Backoff after a failed generation - doubles per consecutive failure, up to the max
+FAILURE_BACKOFF_SECONDS = float(os.getenv("KEY_FEATURES_FAILURE_BACKOFF_SECONDS", "60"))
+FAILURE_BACKOFF_MAX_SECONDS = float(os.getenv("KEY_FEATURES_FAILURE_BACKOFF_MAX_SECONDS", "3600"))
+MAX_TRACKED_FAILURES = 10000
+
+# product id -> in-flight generation, shared by concurrent requests in this worker
+_inflight: Dict[str, asyncio.Task] = {}
+_background_slots: Optional[asyncio.Semaphore] = None
+# product id -> (consecutive failures, monotonic time before which we don't retry)
+_failures: Dict[str, Tuple[int, float]] = {}
+
+
+def _in_backoff(product_id: str) -> bool:
+    failure = _failures.get(product_id)
+    return failure is not None and time.monotonic() < failure[1]
+
+
+def _record_failure(product_id: str) -> None:
+    now = time.monotonic()
+    count = _failures.get(product_id, (0, 0.0))[0] + 1
+    delay = min(FAILURE_BACKOFF_MAX_SECONDS, FAILURE_BACKOFF_SECONDS * 2 ** (count - 1))
+    _failures[product_id] = (count, now + delay)
+    if len(_failures) > MAX_TRACKED_FAILURES:
+        # Drop entries whose backoff has passed (the next failure starts over)
+        for pid in [pid for pid, (_, retry_at) in _failures.items() if retry_at <= now]:
+            del _failures[pid]
+
+
+def stored_features(product: Dict) -> Optional[List[str]]:
+    """Features already stored for a product row (column first, then the legacy attributes key)"""
+    return product.get('key_features') or (product.get('attributes') or {}).get('ai_key_features') or None
+
+
+class KeyFeatureService:
+    def __init__(self, db, ai_service=None):
+        self.db = db  # supabase client
+        self._ai_service = ai_service
+
+    @property
+    def ai_service(self):
+        if self._ai_service is None:
+            from app.services.ai_service import get_ai_service
+            self._ai_service = get_ai_service()
+        return self._ai_service
+
+    def get_for_grid(self, product_ids: List[UUID]) -> Tuple[Dict[str, List[str]], List[Dict]]:
+        """
+        One query for a grid of cards. Returns (stored features by product id, rows still missing features)
+        """
+        if not product_ids:
+            return {}, []
+        response = self.db.table('products')\
+            .select(FEATURE_SOURCE_COLUMNS)\
+            .in_('id', [str(pid) for pid in product_ids])\
+            .execute()
+
+        cached, missing = {}, []
+        for row in response.data:
+            features = stored_features(row)
+            if features:
+                cached[str(row['id'])] = features
+            else:
+                missing.append(row)
+        return cached, missing
+
+    async def generate_missing(self, products: List[Dict]) -> None:
+        """Background generation for a grid's misses, a few at a time per worker, queued behind interactive AI calls"""
+        global _background_slots
+        if _background_slots is None:
+            _background_slots = asyncio.Semaphore(BACKGROUND_CONCURRENCY)
+
+        async def run(product: Dict):
+            async with _background_slots:
+                await self.generate(product, priority=BATCH)
+
+        # Products that failed recently wait out their backoff instead of a new call per poll
+        products = [p for p in products if not _in_backoff(str(p['id']))]
+        await asyncio.gather(*(run(p) for p in products), return_exceptions=True)
+
+    def store(self, product_id: UUID, features: List[str]) -> None:
+        """Write just the key_features column (first writer wins if workers race)"""
+        self.db.table('products')\
+            .update({'key_features': features})\
+            .eq('id', str(product_id))\
+            .is_('key_features', 'null')\
+            .execute()
+
+    def store_many(self, features_by_id: Dict[str, List[str]]) -> None:
+        """Write key_features for many products in one round trip"""
+        if not features_by_id:
+            return
+        updates = [{'id': pid, 'features': features} for pid, features in features_by_id.items()]
+        self.db.rpc('set_product_key_features', {'updates': updates}).execute()
+
+    async def generate(self, product: Dict, priority: int = INTERACTIVE) -> Tuple[List[str], bool]:
+        """
+        Generate and store features for a product row, single-flight per product.
+        Returns (features, stored); provider failures return generic features without storing them,
+        and the product isn't retried until its failure backoff has passed.
+        """
+        product_id = str(product['id'])
+        if _in_backoff(product_id):
+            return self.ai_service.fallback_key_features(product), False
+        task = _inflight.get(product_id)
+        if task is None:
+            task = asyncio.create_task(self._generate_and_store(product, priority))
+            _inflight[product_id] = task
+            task.add_done_callback(lambda _: _inflight.pop(product_id, None))
+        # shield - one caller disconnecting must not cancel the others' generation
+        return await asyncio.shield(task)
+
+    async def _generate_and_store(self, product: Dict, priority: int) -> Tuple[List[str], bool]:
+        try:
+            features = await self.ai_service.generate_product_key_features(product, fallback=False, priority=priority)
+        except Exception as e:
+            print(f"AI Error generating features: {str(e)}")
+            _record_failure(str(product['id']))
+            return self.ai_service.fallback_key_features(product), False
+
+        _failures.pop(str(product['id']), None)
+        await asyncio.to_thread(self.store, product['id'], features)
+        return features, True
+
+    async def get_or_generate(self, product_id: UUID) -> Optional[Tuple[List[str], bool]]:
+        """
+        Features for one product. Returns (features, cached), or None if the product doesn't exist
+        """
+        response = self.db.table('products')\
+            .select(FEATURE_SOURCE_COLUMNS)\
+            .eq('id', str(product_id))\
+            .execute()
+        if not response.data:
+            return None
+
+        product = response.data[0]
+        features = stored_features(product)
+        if features:
+            return features, True
+
+        features, _ = await self.generate(product)
+        return features, False
@@ -3,8 +3,88 @@ Product Service - Supabase REST API version
 Business logic for product management
 """
 
+from collections import OrderedDict
 from typing import List, Optional, Dict
 from uuid import UUID
+from datetime import datetime
+import os
+import threading
+import time
+
+from app.http_cache import bump_catalog_version, catalog_version
+from app.pagination import encode_cursor, decode_cursor
+
+# How long a category's product count is reused before re-counting
+PRODUCT_COUNT_TTL = int(os.getenv("PRODUCT_COUNT_TTL", "300"))
+
+PRODUCT_COUNT_CACHE_SIZE = 512  # product_category is free text, so the key space is unbounded
+
+# (pet_type, product_category) -> (counted_at, total), LRU; only for _count_cache_version
+_count_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_count_cache_version: Optional[int] = None
+_count_cache_lock = threading.Lock()
+
+
+def _cached_count(key: tuple) -> Optional[int]:
+    global _count_cache_version
+    with _count_cache_lock:
+        version = catalog_version()
+        if version != _count_cache_version:
+            # Catalog changed - every count is stale
+            _count_cache.clear()
+            _count_cache_version = version
+            return None
+        cached = _count_cache.get(key)
+        if cached is None:
+            return None
+        if time.monotonic() - cached[0] >= PRODUCT_COUNT_TTL:
+            del _count_cache[key]
+            return None
+        _count_cache.move_to_end(key)
+        return cached[1]
+
+
+def _store_count(key: tuple, version: int, total: int) -> None:
+    with _count_cache_lock:
+        if version != _count_cache_version:
+            return  # Counted against a catalog that has since changed
+        _count_cache[key] = (time.monotonic(), total)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > PRODUCT_COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
+# Named column sets pushed down into the Supabase select
+PRODUCT_VIEWS = {
+    # Grid/list cards - no description or attributes JSONB, just the two AI features
+    "card": "id,name,brand,price,price_unit,image_url,rating,pet_type,product_category,created_at,"
+            "ai_key_features:key_features",
+    "detail": "*",
+}
+
+# Columns selectable through ?fields=
+PRODUCT_COLUMNS = {
+    "id", "name", "brand", "description", "price", "price_unit", "image_url", "rating",
+    "pet_type", "product_category", "attributes", "key_features", "is_active", "created_at"
+}
+
+
+def resolve_product_columns(view: str = "detail", fields: Optional[str] = None) -> str:
+    """
+    Turn a named view or a comma-separated field list into a select clause.
+    id and created_at are always included since pagination cursors need them.
+    Raises ValueError for unknown views or fields.
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in PRODUCT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+        columns = list(dict.fromkeys(["id", "created_at"] + requested))
+        return ",".join(columns)
+    
+    if view not in PRODUCT_VIEWS:
+        raise ValueError(f"Unknown product view: {view}")
+    return PRODUCT_VIEWS[view]
 
 
 class ProductService:
@@ -35,13 +115,110 @@ class ProductService:
         response = query.range(skip, skip + limit - 1).execute()
         return response.data
     
+    def list_products_page(
+        self,
+        pet_type: Optional[str] = None,
+        product_category: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        columns: str = "*"
+    ) -> Dict:
+        """
+        List products newest first with keyset pagination on (created_at, id).
+        Each page costs the same no matter how deep it is. `skip` is only honoured
+        when no cursor is given (legacy offset paging).
+        Returns {products, next_cursor, prev_cursor, total}.
+        """
+        query = self.db.table('products').select(columns).eq('is_active', True)
+        
+        if pet_type:
+            query = query.eq('pet_type', pet_type)
+        
+        if product_category:
+            query = query.eq('product_category', product_category)
+        
+        direction = 'next'
+        if cursor:
+            direction, created_at, product_id = decode_cursor(cursor, parts=3)
+            if direction not in ('next', 'prev'):
+                raise ValueError("Invalid cursor")
+            datetime.fromisoformat(created_at)
+            product_id = UUID(product_id)  # Both raise ValueError on tampered cursors
+            
+            op = 'lt' if direction == 'next' else 'gt'
+            query = query.or_(
+                f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{product_id})'
+            )
+        
+        # Walk backwards for 'prev' pages, then flip the rows back to newest first
+        descending = direction == 'next'
+        query = query.order('created_at', desc=descending).order('id', desc=descending)
+        
+        # Fetch one extra row to detect whether another page exists
+        if cursor or not skip:
+            rows = query.limit(limit + 1).execute().data
+        else:
+            rows = query.range(skip, skip + limit).execute().data
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == 'prev':
+            rows.reverse()
+        
+        next_cursor = None
+        prev_cursor = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            if direction == 'next':
+                if has_more:
+                    next_cursor = encode_cursor('next', last['created_at'], last['id'])
+                if cursor or skip:
+                    prev_cursor = encode_cursor('prev', first['created_at'], first['id'])
+            else:
+                next_cursor = encode_cursor('next', last['created_at'], last['id'])
+                if has_more:
+                    prev_cursor = encode_cursor('prev', first['created_at'], first['id'])
+        
+        return {
+            "products": rows,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+            "total": self.count_products(pet_type=pet_type, product_category=product_category)
+        }
+    
+    def count_products(
+        self,
+        pet_type: Optional[str] = None,
+        product_category: Optional[str] = None
+    ) -> int:
+        """Estimated count of active products for a filter, cached per catalog version"""
+        key = (pet_type, product_category)
+        version = catalog_version()
+        cached = _cached_count(key)
+        if cached is not None:
+            return cached
+        
+        query = self.db.table('products').select('id', count='estimated').eq('is_active', True)
+        
+        if pet_type:
+            query = query.eq('pet_type', pet_type)
+        
+        if product_category:
+            query = query.eq('product_category', product_category)
+        
+        total = query.limit(1).execute().count or 0
+        _store_count(key, version, total)
+        return total
+    
     def search_products(
         self, 
         query: str, 
-        pet_type: Optional[str] = None
+        pet_type: Optional[str] = None,
+        columns: str = "*"
     ) -> List[Dict]:
         """Search products by name or brand"""
-        response = self.db.table('products').select('*').eq('is_active', True).or_(
+        response = self.db.table('products').select(columns).eq('is_active', True).or_(
             f'name.ilike.%{query}%,brand.ilike.%{query}%'
         )
         
@@ -51,13 +228,14 @@ class ProductService:
         result = response.limit(20).execute()
         return result.data
     
-    def get_products_by_ids(self, product_ids: List[UUID]) -> List[Dict]:
+    def get_products_by_ids(self, product_ids: List[UUID], columns: str = "*") -> List[Dict]:
         """Get multiple products by their IDs"""
         str_ids = [str(pid) for pid in product_ids]
-        response = self.db.table('products').select('*').in_('id', str_ids).eq('is_active', True).execute()
+        response = self.db.table('products').select(columns).in_('id', str_ids).eq('is_active', True).execute()
         return response.data
     
     def update_product(self, product_id: UUID, data: Dict) -> Optional[Dict]:
         """Update product"""
         response = self.db.table('products').update(data).eq('id', str(product_id)).execute()
-        return response.data[0] if response.data else None
\ No newline at end of file
+        bump_catalog_version()
+        return response.data[0] if response.data else None
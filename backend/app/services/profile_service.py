@@ -57,13 +57,26 @@ class ProfileService:
         response = query.range(skip, skip + limit - 1).execute()
         return response.data
     
-    def update_profile(self, profile_id: UUID, profile_update) -> Dict:
-        """Update profile and invalidate cache if critical fields changed"""
-        profile = self.get_profile(profile_id)
-        if not profile:
-            raise ValueError("Profile not found")
+    def get_user_profiles(self, user_id: UUID, profile_ids: Optional[List[UUID]] = None) -> List[Dict]:
+        """Get all of a user's profiles (optionally only the given IDs) in one query"""
+        query = self.db.table('profiles').select('*').eq('user_id', str(user_id))
+        
+        if profile_ids:
+            query = query.in_('id', [str(pid) for pid in profile_ids])
         
-        # Build update dict
+        response = query.execute()
+        return response.data
+    
+    def get_user_profile(self, profile_id: UUID, user_id: UUID) -> Optional[Dict]:
+        """Get profile by ID, only if it belongs to the user"""
+        response = self.db.table('profiles').select('*')\
+            .eq('id', str(profile_id))\
+            .eq('user_id', str(user_id))\
+            .execute()
+        return response.data[0] if response.data else None
+    
+    def _build_update_data(self, profile_update) -> Dict:
+        """Build update dict, clearing cached recommendations if critical fields changed"""
         update_data = {}
         for field, value in profile_update.dict(exclude_unset=True).items():
             if value is not None:
@@ -79,16 +92,49 @@ class ProfileService:
         if should_invalidate:
             update_data['recommended_product_ids'] = []
             update_data['recommendations_generated_at'] = None
+        
+        return update_data
+    
+    def update_profile(self, profile_id: UUID, profile_update) -> Dict:
+        """Update profile and invalidate cache if critical fields changed"""
+        profile = self.get_profile(profile_id)
+        if not profile:
+            raise ValueError("Profile not found")
+        
+        update_data = self._build_update_data(profile_update)
+        if 'recommended_product_ids' in update_data:
             update_data['recommendations_cache_version'] = profile.get('recommendations_cache_version', 1) + 1
         
         response = self.db.table('profiles').update(update_data).eq('id', str(profile_id)).execute()
         return response.data[0] if response.data else None
     
+    def update_user_profile(self, profile_id: UUID, user_id: UUID, profile_update) -> Optional[Dict]:
+        """
+        Update a profile owned by the user in a single round-trip.
+        Returns the updated row, or None if it doesn't exist or isn't owned by the user.
+        Clearing recommended_product_ids is what invalidates the recommendation cache,
+        so the version counter (which needs a read to increment) is left untouched.
+        """
+        update_data = self._build_update_data(profile_update)
+        response = self.db.table('profiles').update(update_data)\
+            .eq('id', str(profile_id))\
+            .eq('user_id', str(user_id))\
+            .execute()
+        return response.data[0] if response.data else None
+    
     def delete_profile(self, profile_id: UUID) -> bool:
         """Delete a profile"""
         response = self.db.table('profiles').delete().eq('id', str(profile_id)).execute()
         return len(response.data) > 0
     
+    def delete_user_profile(self, profile_id: UUID, user_id: UUID) -> bool:
+        """Delete a profile owned by the user in a single round-trip"""
+        response = self.db.table('profiles').delete()\
+            .eq('id', str(profile_id))\
+            .eq('user_id', str(user_id))\
+            .execute()
+        return len(response.data) > 0
+    
     def invalidate_recommendation_cache(self, profile_id: UUID) -> None:
         """Invalidate cached recommendations when profile changes"""
         profile = self.get_profile(profile_id)
@@ -0,0 +1,158 @@
+"""
+Rate Limit Service - token buckets for expensive endpoints
+In-memory by default, Redis-backed when REDIS_URL is set
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class InMemoryBucketStore:
+    """Token buckets kept in process memory (per worker)"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, last_refill)
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, refill_per_sec: float) -> Tuple[bool, float]:
+        """Take one token from the bucket. Returns (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - last) * refill_per_sec)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                allowed, retry_after = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, (1 - tokens) / refill_per_sec
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, capacity, refill_per_sec)
+
+        return allowed, retry_after
+
+    def _prune(self, now: float, capacity: int, refill_per_sec: float) -> None:
+        """Drop buckets that have refilled completely (they carry no state)"""
+        full_after = capacity / refill_per_sec
+        stale = [k for k, (_, last) in self._buckets.items() if now - last >= full_after]
+        for k in stale:
+            del self._buckets[k]
+
+
+class RedisBucketStore:
+    """Token buckets shared across workers through Redis"""
+
+    # Refill and take a token atomically; returns {allowed, retry_after_ms}
+    LUA_CONSUME = """
+    local key = KEYS[1]
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    else
+        retry_after = math.ceil((1 - tokens) / rate * 1000)
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+    return {allowed, retry_after}
+    """
+
+    def __init__(self, redis_url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+        self._consume = self.client.register_script(self.LUA_CONSUME)
+
+    def consume(self, key: str, capacity: int, refill_per_sec: float) -> Tuple[bool, float]:
+        """Take one token from the bucket. Returns (allowed, retry_after_seconds)"""
+        allowed, retry_after_ms = self._consume(
+            keys=[f"ratelimit:{key}"],
+            args=[capacity, refill_per_sec, time.time()]
+        )
+        return bool(allowed), int(retry_after_ms) / 1000
+
+
+class RateLimitService:
+    """Per-IP and per-email limits for login/register, per-user/IP limit for AI generation"""
+
+    def __init__(self, store=None):
+        self.ip_per_minute = int(os.getenv("AUTH_RATE_LIMIT_IP_PER_MINUTE", "20"))
+        self.email_per_minute = int(os.getenv("AUTH_RATE_LIMIT_EMAIL_PER_MINUTE", "5"))
+        # Grid requests that may schedule AI key-feature generation (per user, or per IP when anonymous)
+        self.key_features_per_minute = int(os.getenv("KEY_FEATURES_RATE_LIMIT_IP_PER_MINUTE", "10"))
+
+        if store is not None:
+            self.store = store
+        elif os.getenv("REDIS_URL"):
+            self.store = RedisBucketStore(os.getenv("REDIS_URL"))
+            print("✅ Rate limiting backed by Redis")
+        else:
+            self.store = InMemoryBucketStore()
+
+    def _consume(self, key: str, per_minute: int) -> Tuple[bool, float]:
+        if per_minute <= 0:
+            return True, 0.0  # Limit disabled
+        try:
+            return self.store.consume(key, per_minute, per_minute / 60)
+        except Exception as e:
+            # Fail open - a broken limiter must not lock everyone out
+            print(f"⚠️  Rate limiter error: {str(e)}")
+            return True, 0.0
+
+    def check_ip(self, scope: str, ip: str) -> Tuple[bool, float]:
+        """Check the per-IP bucket for an auth scope (login/register)"""
+        return self._consume(f"{scope}:ip:{ip}", self.ip_per_minute)
+
+    def check_email(self, scope: str, email: str) -> Tuple[bool, float]:
+        """Check the per-email bucket for an auth scope (login/register)"""
+        return self._consume(f"{scope}:email:{email.strip().lower()}", self.email_per_minute)
+
+    def check_generation(self, ip: str, user_id: Optional[str] = None) -> Tuple[bool, float]:
+        """
+        Check the bucket for scheduling background key-feature generation -
+        per user when signed in, per client IP otherwise
+        """
+        key = f"key_features:user:{user_id}" if user_id else f"key_features:ip:{ip}"
+        return self._consume(key, self.key_features_per_minute)
+
+
+_rate_limiter: Optional[RateLimitService] = None
+
+
+def get_rate_limiter() -> RateLimitService:
+    """Process-wide rate limiter (created on first use)"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimitService()
+    return _rate_limiter
+
+
+# Number of reverse proxies in front of the app that append to X-Forwarded-For
+# (Render: 1). 0 ignores the header - anything the client sends in it is spoofable.
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+
+
+def get_client_ip(request) -> str:
+    """
+    Client IP for rate limiting
+    Each trusted proxy appends the address it saw, so the client is the entry
+    TRUSTED_PROXY_COUNT hops from the right; entries further left are client-supplied.
+    """
+    if TRUSTED_PROXY_COUNT > 0:
+        forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_COUNT:
+            return forwarded[-TRUSTED_PROXY_COUNT]
+    return request.client.host if request.client else "unknown"
@@ -1,20 +1,27 @@
 from uuid import UUID
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+import asyncio
+import os
 import uuid as uuid_lib
 
 from app.services.profile_service import ProfileService
 from app.services.product_service import ProductService
-from app.services.ai_service import AIService
-from app.schemas import RecommendationResponse, RecommendationItem, ComparisonResponse
+from app.services.ai_service import get_ai_service
+from app.schemas import RecommendationResponse, RecommendationItem, ComparisonResponse, BatchRecommendationResponse
+
+# Max profiles processed at once by a batch request
+BATCH_CONCURRENCY = int(os.getenv("RECOMMENDATION_BATCH_CONCURRENCY", "3"))
+# Max products scored at once per profile (AI call + cache write each)
+PRODUCT_CONCURRENCY = int(os.getenv("RECOMMENDATION_PRODUCT_CONCURRENCY", "4"))
 
 
 class RecommendationService:
-    def __init__(self, db):
+    def __init__(self, db, ai_service=None):
         self.db = db  # supabase client
         self.profile_service = ProfileService(db)
         self.product_service = ProductService(db)
-        self.ai_service = AIService()
+        self.ai_service = ai_service or get_ai_service()
     
     async def generate_recommendations(
         self,
@@ -24,37 +31,131 @@ class RecommendationService:
     ) -> RecommendationResponse:
         """Generate personalized product recommendations with caching"""
         # Get profile
-        profile = self.profile_service.get_profile(profile_id)
+        profile = await asyncio.to_thread(self.profile_service.get_profile, profile_id)
         if not profile:
             raise ValueError("Profile not found")
         
-        # Check if we can use cached product IDs
+        return await self._recommend_for_profile(profile, limit, force_refresh)
+    
+    async def generate_recommendations_batch(
+        self,
+        user_id: UUID,
+        profile_ids: Optional[List[UUID]] = None,
+        limit: int = 10,
+        force_refresh: bool = False
+    ) -> BatchRecommendationResponse:
+        """
+        Generate recommendations for several of a user's profiles in one pass.
+        Profiles, cached products, category catalogs and cached recommendation rows
+        are each loaded with a single query and shared across profiles. Blocking
+        Supabase calls run in threads, so profiles and their products overlap.
+        """
+        profiles = await asyncio.to_thread(self.profile_service.get_user_profiles, user_id, profile_ids)
+        if profile_ids:
+            found = {p['id'] for p in profiles}
+            missing = [str(pid) for pid in profile_ids if str(pid) not in found]
+            if missing:
+                raise ValueError(f"Profile not found: {', '.join(missing)}")
+        
+        # Products for profiles served from cache - one query for all of them
+        cached_ids = []
+        for profile in profiles:
+            if self._can_use_cache(profile, force_refresh):
+                cached_ids.extend(profile['recommended_product_ids'][:limit])
+        products_by_id = {}
+        if cached_ids:
+            unique_ids = [UUID(pid) for pid in dict.fromkeys(cached_ids)]
+            rows = await asyncio.to_thread(self.product_service.get_products_by_ids, unique_ids)
+            products_by_id = {p['id']: p for p in rows}
+        
+        # Candidate catalogs for profiles that need regenerating - one query per category
+        catalogs = {}
+        for profile in profiles:
+            category = profile['profile_category']
+            if not self._can_use_cache(profile, force_refresh) and category not in catalogs:
+                catalogs[category] = await asyncio.to_thread(
+                    self.product_service.list_products, pet_type=category, limit=100
+                )
+        
+        # Cached recommendation rows for every profile - one query
+        cached_recs = {}
+        if profiles and not force_refresh:
+            response = await asyncio.to_thread(
+                lambda: self.db.table('recommendations').select('*').in_(
+                    'profile_id', [p['id'] for p in profiles]
+                ).execute()
+            )
+            cached_recs = {(r['profile_id'], r['product_id']): r for r in response.data}
+        
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def run(profile):
+            async with semaphore:
+                return await self._recommend_for_profile(
+                    profile,
+                    limit,
+                    force_refresh,
+                    catalog=catalogs.get(profile['profile_category']),
+                    products_by_id=products_by_id,
+                    cached_recs=cached_recs
+                )
+        
+        outcomes = await asyncio.gather(*(run(p) for p in profiles), return_exceptions=True)
+        
+        results = []
+        errors = {}
+        for profile, outcome in zip(profiles, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"❌ Batch recommendations failed for {profile['name']}: {str(outcome)}")
+                errors[profile['id']] = str(outcome)
+            else:
+                results.append(outcome)
+        
+        return BatchRecommendationResponse(
+            results=results,
+            errors=errors,
+            generated_at=datetime.utcnow()
+        )
+    
+    def _can_use_cache(self, profile: Dict, force_refresh: bool) -> bool:
+        """Whether the profile's cached recommended product IDs are still fresh"""
         cache_age_days = 7
         recommendations_generated_at = profile.get('recommendations_generated_at')
-        can_use_cache = (
+        return bool(
             not force_refresh
             and profile.get('recommended_product_ids')
             and recommendations_generated_at
             and (datetime.utcnow() - datetime.fromisoformat(recommendations_generated_at)).days < cache_age_days
         )
+    
+    async def _recommend_for_profile(
+        self,
+        profile: Dict,
+        limit: int,
+        force_refresh: bool,
+        catalog: Optional[List[Dict]] = None,
+        products_by_id: Optional[Dict[str, Dict]] = None,
+        cached_recs: Optional[Dict] = None
+    ) -> RecommendationResponse:
+        """Build recommendations for a loaded profile, using preloaded data when given"""
+        profile_id = profile['id']
         
-        if can_use_cache:
+        if self._can_use_cache(profile, force_refresh):
             print(f"✅ Using cached recommendations for {profile['name']}")
+            recommendations_generated_at = profile['recommendations_generated_at']
             
             # Get products by cached IDs
-            product_ids = [UUID(pid) for pid in profile['recommended_product_ids'][:limit]]
-            recommended_products = self.product_service.get_products_by_ids(product_ids)
+            cached_product_ids = profile['recommended_product_ids'][:limit]
+            if products_by_id is not None:
+                recommended_products = [products_by_id[pid] for pid in cached_product_ids if pid in products_by_id]
+            else:
+                product_ids = [UUID(pid) for pid in cached_product_ids]
+                recommended_products = await asyncio.to_thread(self.product_service.get_products_by_ids, product_ids)
             
             # Get cached recommendation details
-            recommendation_items = []
-            
-            for product in recommended_products:
-                rec_item = await self._get_or_create_recommendation(
-                    profile, 
-                    product,
-                    force_refresh=False
-                )
-                recommendation_items.append(rec_item)
+            recommendation_items = await self._recommend_products(
+                profile, recommended_products, force_refresh=False, cached_recs=cached_recs
+            )
             
             recommendation_items.sort(key=lambda x: x.match_score, reverse=True)
             
@@ -70,10 +171,14 @@ class RecommendationService:
         print(f"🤖 Generating NEW recommendations for {profile['name']}")
         
         # Get all products for category
-        all_products = self.product_service.list_products(
-            pet_type=profile['profile_category'],
-            limit=100
-        )
+        if catalog is not None:
+            all_products = catalog
+        else:
+            all_products = await asyncio.to_thread(
+                self.product_service.list_products,
+                pet_type=profile['profile_category'],
+                limit=100
+            )
         
         # Filter and score products
         safe_products = []
@@ -87,17 +192,9 @@ class RecommendationService:
                 filtered_out_count += 1
         
         # Generate AI recommendations for top products
-        recommendation_items = []
-        recommended_ids = []
-        
-        for product in safe_products[:limit]:
-            rec_item = await self._get_or_create_recommendation(
-                profile, 
-                product,
-                force_refresh=force_refresh
-            )
-            recommendation_items.append(rec_item)
-            recommended_ids.append(product['id'])
+        recommendation_items = await self._recommend_products(
+            profile, safe_products[:limit], force_refresh=force_refresh, cached_recs=cached_recs
+        )
         
         # Sort by match score
         recommendation_items.sort(key=lambda x: x.match_score, reverse=True)
@@ -110,7 +207,9 @@ class RecommendationService:
             'recommended_product_ids': recommended_ids,
             'recommendations_generated_at': datetime.utcnow().isoformat()
         }
-        self.db.table('profiles').update(update_data).eq('id', str(profile_id)).execute()
+        await asyncio.to_thread(
+            lambda: self.db.table('profiles').update(update_data).eq('id', str(profile_id)).execute()
+        )
         
         print(f"💾 Cached {len(recommended_ids)} product IDs for {profile['name']}")
         
@@ -132,20 +231,17 @@ class RecommendationService:
             raise ValueError("Can only compare 2-4 products")
         
         # Get profile
-        profile = self.profile_service.get_profile(profile_id)
+        profile = await asyncio.to_thread(self.profile_service.get_profile, profile_id)
         if not profile:
             raise ValueError("Profile not found")
         
         # Get products
-        products = self.product_service.get_products_by_ids(product_ids)
+        products = await asyncio.to_thread(self.product_service.get_products_by_ids, product_ids)
         if len(products) != len(product_ids):
             raise ValueError("One or more products not found")
         
         # Get individual recommendations
-        recommendation_items = []
-        for product in products:
-            rec_item = await self._get_or_create_recommendation(profile, product)
-            recommendation_items.append(rec_item)
+        recommendation_items = await self._recommend_products(profile, products)
         
         # Generate comparison summary
         comparison_result = await self.ai_service.generate_comparison_summary(
@@ -168,21 +264,46 @@ class RecommendationService:
             generated_at=datetime.utcnow()
         )
         
+    async def _recommend_products(
+        self,
+        profile: Dict,
+        products: List[Dict],
+        force_refresh: bool = False,
+        cached_recs: Optional[Dict] = None
+    ) -> List[RecommendationItem]:
+        """Recommendation items for several products, up to PRODUCT_CONCURRENCY at a time (in product order)"""
+        semaphore = asyncio.Semaphore(PRODUCT_CONCURRENCY)
+        
+        async def run(product: Dict) -> RecommendationItem:
+            async with semaphore:
+                return await self._get_or_create_recommendation(
+                    profile, product, force_refresh=force_refresh, cached_recs=cached_recs
+                )
+        
+        return list(await asyncio.gather(*(run(p) for p in products)))
+    
     async def _get_or_create_recommendation(
         self,
         profile: Dict,
         product: Dict,
-        force_refresh: bool = False
+        force_refresh: bool = False,
+        cached_recs: Optional[Dict] = None
     ) -> RecommendationItem:
         """Get cached recommendation or generate new one"""
-        # Check cache
+        # Check cache (preloaded rows when called from a batch)
         if not force_refresh:
-            response = self.db.table('recommendations').select('*').eq(
-                'profile_id', profile['id']
-            ).eq('product_id', product['id']).execute()
+            if cached_recs is not None:
+                cached = cached_recs.get((str(profile['id']), str(product['id'])))
+            else:
+                # Supabase calls block - run them off the event loop so other products proceed
+                response = await asyncio.to_thread(
+                    lambda: self.db.table('recommendations').select('*').eq(
+                        'profile_id', profile['id']
+                    ).eq('product_id', product['id']).execute()
+                )
+                cached = response.data[0] if response.data else None
             
-            if response.data:
-                cached = response.data[0]
+            if cached:
                 return RecommendationItem(
                     product=product,
                     is_safe=cached['is_safe'],
@@ -207,6 +328,18 @@ class RecommendationService:
             traceback.print_exc()
             raise
 
+        if ai_result.get("is_fallback"):
+            # Canned answer from a failed AI call - serve it, but don't cache it over a real one
+            return RecommendationItem(
+                product=product,
+                is_safe=True,
+                match_score=int(ai_result["match_score"]),
+                explanation=str(ai_result["explanation"]),
+                pros=ai_result["pros"],
+                cons=ai_result["cons"],
+                generated_at=datetime.utcnow()
+            )
+
         # Save to cache
         recommendation = {
             "id": str(uuid_lib.uuid4()),
@@ -228,23 +361,7 @@ class RecommendationService:
         print(f"   Cons: {recommendation['cons']}")
 
         try:
-            # Check if exists
-            existing = self.db.table('recommendations').select('*').eq(
-                'profile_id', str(profile['id'])
-            ).eq('product_id', str(product['id'])).execute()
-            
-            if existing.data:
-                # Update
-                print(f"   Updating existing recommendation {existing.data[0]['id']}...")
-                update_result = self.db.table('recommendations').update({
-                    k: v for k, v in recommendation.items() if k != 'id'
-                }).eq('id', existing.data[0]['id']).execute()
-                print(f"✅ Update successful: {update_result}")
-            else:
-                # Insert
-                print(f"   Inserting new recommendation...")
-                insert_result = self.db.table('recommendations').insert(recommendation).execute()
-                print(f"✅ Insert successful: {insert_result}")
+            await asyncio.to_thread(self._save_recommendation, recommendation)
         except Exception as e:
             print(f"❌ Database error: {type(e).__name__}: {str(e)}")
             import traceback
@@ -260,6 +377,27 @@ class RecommendationService:
             cons=recommendation['cons'],
             generated_at=datetime.utcnow()
         )
+    
+    def _save_recommendation(self, recommendation: Dict) -> None:
+        """Insert or update the cached recommendation row (blocking - called via to_thread)"""
+        # Check if exists
+        existing = self.db.table('recommendations').select('*').eq(
+            'profile_id', recommendation['profile_id']
+        ).eq('product_id', recommendation['product_id']).execute()
+        
+        if existing.data:
+            # Update
+            print(f"   Updating existing recommendation {existing.data[0]['id']}...")
+            update_result = self.db.table('recommendations').update({
+                k: v for k, v in recommendation.items() if k != 'id'
+            }).eq('id', existing.data[0]['id']).execute()
+            print(f"✅ Update successful: {update_result}")
+        else:
+            # Insert
+            print(f"   Inserting new recommendation...")
+            insert_result = self.db.table('recommendations').insert(recommendation).execute()
+            print(f"✅ Insert successful: {insert_result}")
+    
     def _check_product_safety(self, profile: Dict, product: Dict) -> tuple[bool, List[str]]:
         """Check if product is safe for profile"""
         reasons = []
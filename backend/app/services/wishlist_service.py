@@ -0,0 +1,136 @@
+"""
+Wishlist Service - Supabase REST API version
+Business logic for user wishlists
+"""
+
+from typing import List, Optional, Dict, Tuple
+from uuid import UUID
+from datetime import datetime
+
+from app.pagination import encode_cursor, decode_cursor
+from app.services.product_service import PRODUCT_VIEWS
+
+
+class WishlistService:
+    def __init__(self, db):
+        self.db = db  # supabase client
+
+    def get_wishlist(
+        self,
+        user_id: UUID,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        expand: bool = False
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get a page of the user's wishlist, newest first.
+        Products carry card fields only unless expand=True.
+        Returns (items, next_cursor); next_cursor is None on the last page.
+        """
+        product_fields = PRODUCT_VIEWS['detail' if expand else 'card']
+        query = self.db.table('wishlists')\
+            .select(f'*, product:products({product_fields})')\
+            .eq('user_id', str(user_id))
+        
+        if cursor:
+            added_at, item_id = decode_cursor(cursor)
+            datetime.fromisoformat(added_at)
+            item_id = UUID(item_id)  # Both raise ValueError on tampered cursors
+            query = query.or_(
+                f'added_at.lt."{added_at}",and(added_at.eq."{added_at}",id.lt.{item_id})'
+            )
+        
+        # Keyset pagination on (added_at, id) - fetch one extra row to detect the next page
+        response = query.order('added_at', desc=True)\
+            .order('id', desc=True)\
+            .limit(limit + 1)\
+            .execute()
+        
+        items = response.data[:limit]
+        next_cursor = None
+        if len(response.data) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last['added_at'], last['id'])
+        return items, next_cursor
+
+    def get_product_ids(self, user_id: UUID, batch_size: int = 1000) -> List[str]:
+        """All product IDs in the user's wishlist (for in-wishlist markers), newest first"""
+        product_ids = []
+        while True:
+            # PostgREST caps rows per request, so read in ranges
+            response = self.db.table('wishlists')\
+                .select('product_id')\
+                .eq('user_id', str(user_id))\
+                .order('added_at', desc=True)\
+                .order('id', desc=True)\
+                .range(len(product_ids), len(product_ids) + batch_size - 1)\
+                .execute()
+            product_ids.extend(row['product_id'] for row in response.data)
+            if len(response.data) < batch_size:
+                return product_ids
+
+    def _insert_ignoring_duplicates(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Insert rows with ON CONFLICT (user_id, product_id) DO NOTHING.
+        Only newly inserted rows come back, so existing items are detected
+        in the same round-trip and concurrent adds can't race.
+        """
+        response = self.db.table('wishlists').upsert(
+            rows,
+            on_conflict='user_id,product_id',
+            ignore_duplicates=True
+        ).execute()
+        return response.data
+
+    def add_item(
+        self,
+        user_id: UUID,
+        product_id: UUID,
+        profile_id: Optional[UUID] = None,
+        notes: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Add a product to the wishlist. Returns None if it was already there"""
+        rows = self._insert_ignoring_duplicates([{
+            'user_id': str(user_id),
+            'product_id': str(product_id),
+            'profile_id': str(profile_id) if profile_id else None,
+            'notes': notes
+        }])
+        return rows[0] if rows else None
+
+    def add_items(
+        self,
+        user_id: UUID,
+        product_ids: List[UUID],
+        profile_id: Optional[UUID] = None,
+        notes: Optional[str] = None
+    ) -> Tuple[List[Dict], List[str]]:
+        """Add several products at once. Returns (added rows, product IDs already present)"""
+        unique_ids = list(dict.fromkeys(str(pid) for pid in product_ids))
+        added = self._insert_ignoring_duplicates([{
+            'user_id': str(user_id),
+            'product_id': pid,
+            'profile_id': str(profile_id) if profile_id else None,
+            'notes': notes
+        } for pid in unique_ids])
+
+        added_ids = {row['product_id'] for row in added}
+        already_present = [pid for pid in unique_ids if pid not in added_ids]
+        return added, already_present
+
+    def remove_item(self, user_id: UUID, wishlist_id: UUID) -> bool:
+        """Remove an item by wishlist ID (owner-scoped). Returns False if not found"""
+        response = self.db.table('wishlists')\
+            .delete()\
+            .eq('id', str(wishlist_id))\
+            .eq('user_id', str(user_id))\
+            .execute()
+        return len(response.data) > 0
+
+    def remove_product(self, user_id: UUID, product_id: UUID) -> None:
+        """Remove an item by product ID"""
+        self.db.table('wishlists')\
+            .delete()\
+            .eq('user_id', str(user_id))\
+            .eq('product_id', str(product_id))\
+            .execute()
@@ -1,31 +1,88 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
+import secrets
+import time
 from dotenv import load_dotenv
 
 from app.routers import profiles, products, recommendations, auth, templates, wishlist
+from app.services.rate_limit_service import get_rate_limiter, get_client_ip
+from app.services.email_service import shutdown_email_queue
+from app.services.ai_service import close_ai_service, get_ai_service
+from app.services.ai_providers import ai_metrics
+from app.services.ai_rate_limiter import limiter_snapshot
 
 load_dotenv()
 
 
+def warm_up():
+    """
+    Build the slow-to-import clients (Supabase, the AI provider SDK, JWT/bcrypt) off the
+    startup path, so /health answers as soon as the server is up. Whatever isn't ready
+    yet is built by the first request that needs it.
+    """
+    from app.database import get_supabase
+    from app.services.auth_service import AuthService, get_pwd_context
+
+    started = time.perf_counter()
+    for name, step in (
+        ("Supabase client", get_supabase),
+        ("AI service", get_ai_service),  # One AIService (and provider SDK client) for the whole process
+        ("auth", lambda: (get_pwd_context(), AuthService.decode_token(""))),
+    ):
+        try:
+            step()
+        except Exception as e:
+            print(f"⚠️  {name} not ready: {str(e)}")
+    print(f"🔥 Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting up - Supabase REST API mode...")
     print("✅ Using HTTPS database connection")
+    if os.getenv("STARTUP_WARMUP", "true").lower() == "true":
+        app.state.warm_up = asyncio.create_task(asyncio.to_thread(warm_up))
     yield
     # Shutdown
     print("👋 Shutting down...")
+    await shutdown_email_queue()
+    close_ai_service()
 
 
 app = FastAPI(
     title="AI Persona Shopping API",
     description="Personalized product recommendations API - Pet Food MVP (extensible to multiple niches)",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Rate limiting for auth endpoints (runs before body parsing, bcrypt and DB calls)
+RATE_LIMITED_PATHS = {
+    "/api/auth/login": "login",
+    "/api/auth/register": "register",
+}
+
+
+@app.middleware("http")
+async def auth_rate_limit(request: Request, call_next):
+    scope = RATE_LIMITED_PATHS.get(request.url.path)
+    if scope and request.method == "POST":
+        allowed, retry_after = get_rate_limiter().check_ip(scope, get_client_ip(request))
+        if not allowed:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests, please try again later"},
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+            )
+    return await call_next(request)
+
+
 # CORS Configuration
 # CORS Configuration
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
@@ -37,6 +94,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Include Routers
@@ -64,6 +122,22 @@ async def health_check():
     return {"status": "healthy", "database": "supabase"}
 
 
+def require_metrics_token(request: Request):
+    """Internal endpoints: Authorization: Bearer $METRICS_TOKEN; without METRICS_TOKEN they don't exist"""
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "").encode()
+    if not secrets.compare_digest(supplied, f"Bearer {token}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+@app.get("/metrics/ai", dependencies=[Depends(require_metrics_token)], include_in_schema=False)
+async def ai_metrics_snapshot():
+    """AI call counters per provider/operation - fallbacks are counted apart from real results"""
+    return {**ai_metrics.snapshot(), "rate_limits": limiter_snapshot()}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
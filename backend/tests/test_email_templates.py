@@ -0,0 +1,69 @@
+"""Pre-rendered email bodies: recipient fields spliced into the cached render"""
+
+import pytest
+from jinja2 import DictLoader, Environment, TemplateError
+
+from app import email_templates
+from app.email_templates import check_recipient_fields, render_bulk, render_recommendations, render_welcome
+
+PRODUCTS = [{"id": "1", "name": "Salmon & Rice", "brand": "Acme", "price": 54.98, "description": "Grain free"}]
+
+
+@pytest.fixture
+def filtered_welcome(monkeypatch):
+    """The welcome email with its recipient field behind a filter"""
+    env = Environment(loader=DictLoader({"welcome.html": "<p>Hi {{ user_name|upper }}</p>"}), autoescape=True)
+    monkeypatch.setitem(email_templates.TEMPLATES, "welcome", env.get_template("welcome.html"))
+    email_templates._compiled_body.cache_clear()
+    yield env
+    email_templates._compiled_body.cache_clear()
+
+
+def test_filtered_recipient_field_is_rejected_at_import(filtered_welcome):
+    with pytest.raises(TemplateError, match="user_name"):
+        check_recipient_fields(filtered_welcome, ["user_name"])
+
+
+@pytest.mark.parametrize("source", [
+    "{% if user_name %}Hi{% endif %}",
+    "{% set name = user_name %}{{ name }}",
+    "{{ user_name ~ '!' }}",
+])
+def test_recipient_field_logic_is_rejected(source):
+    env = Environment(loader=DictLoader({"t.html": source}))
+    with pytest.raises(TemplateError):
+        check_recipient_fields(env, ["user_name"])
+
+
+def test_plain_recipient_fields_pass():
+    env = Environment(loader=DictLoader({"t.html": "{{ user_name }}{{ other|upper }}"}))
+    check_recipient_fields(env, ["user_name"])
+
+
+def test_filtered_recipient_field_fails_loudly_at_render(filtered_welcome):
+    # Skipping the import check must not silently send "Hi \x00USER_NAME\x00"
+    with pytest.raises(TemplateError):
+        render_welcome("Rex")
+
+
+@pytest.mark.parametrize("user_name", ["Rex", "<script>alert(1)</script>", "Tom & \"Jerry\" 'O'", "🐕"])
+def test_splice_matches_plain_render(user_name):
+    year = email_templates.datetime.now().year
+    cards = tuple(email_templates.product_cards(PRODUCTS))
+    expected = email_templates.TEMPLATES["recommendations"].render(
+        year=year, user_name=user_name, product_cards=cards
+    )
+    assert render_recommendations(user_name, PRODUCTS)[1] == expected
+
+
+def test_recipient_values_are_escaped():
+    html = render_welcome("<b>Rex</b>")[1]
+    assert "&lt;b&gt;Rex&lt;/b&gt;" in html
+    assert "<b>Rex</b>" not in html
+
+
+def test_bulk_matches_single_renders():
+    contexts = [{"user_name": name, "products": PRODUCTS} for name in ("Ann", "Bob")]
+    assert render_bulk("recommendations", contexts) == [
+        render_recommendations(c["user_name"], c["products"]) for c in contexts
+    ]
@@ -0,0 +1,59 @@
+"""Per-IP rate limiting behind a reverse proxy"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import rate_limit_service
+from app.services.rate_limit_service import InMemoryBucketStore, RateLimitService, get_client_ip
+
+PROXY_IP = "10.0.0.1"
+
+
+def proxied_request(forwarded_for: str):
+    """A request as the app sees it behind one proxy: the socket peer is always the proxy"""
+    return SimpleNamespace(headers={"x-forwarded-for": forwarded_for}, client=SimpleNamespace(host=PROXY_IP))
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setenv("AUTH_RATE_LIMIT_IP_PER_MINUTE", "2")
+    return RateLimitService(store=InMemoryBucketStore())
+
+
+def test_clients_behind_one_proxy_get_separate_buckets(monkeypatch, limiter):
+    monkeypatch.setattr(rate_limit_service, "TRUSTED_PROXY_COUNT", 1)
+    alice, bob = proxied_request("203.0.113.7"), proxied_request("198.51.100.9")
+
+    assert get_client_ip(alice) == "203.0.113.7"
+    assert get_client_ip(bob) == "198.51.100.9"
+
+    for _ in range(2):
+        assert limiter.check_ip("login", get_client_ip(alice))[0]
+    assert not limiter.check_ip("login", get_client_ip(alice))[0]
+    # Alice using up her bucket doesn't lock Bob out
+    assert limiter.check_ip("login", get_client_ip(bob))[0]
+
+
+def test_spoofed_forwarded_entries_are_ignored(monkeypatch):
+    monkeypatch.setattr(rate_limit_service, "TRUSTED_PROXY_COUNT", 1)
+    # The client sent "6.6.6.6" itself; the proxy appended the real address
+    assert get_client_ip(proxied_request("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+
+
+def test_header_ignored_without_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(rate_limit_service, "TRUSTED_PROXY_COUNT", 0)
+    assert get_client_ip(proxied_request("203.0.113.7")) == PROXY_IP
+
+
+def test_generation_budget_is_per_user_when_signed_in(monkeypatch):
+    monkeypatch.setenv("KEY_FEATURES_RATE_LIMIT_IP_PER_MINUTE", "1")
+    limiter = RateLimitService(store=InMemoryBucketStore())
+
+    # Same IP (e.g. an office NAT), different signed-in users
+    assert limiter.check_generation("203.0.113.7", user_id="user-a")[0]
+    assert limiter.check_generation("203.0.113.7", user_id="user-b")[0]
+    assert not limiter.check_generation("203.0.113.7", user_id="user-a")[0]
+    # Anonymous requests still share the IP's bucket
+    assert limiter.check_generation("203.0.113.7")[0]
+    assert not limiter.check_generation("203.0.113.7")[0]
@@ -40,7 +40,7 @@ export default function Navbar() {
         queryKey: ['all-products-search'],
         queryFn: async () => {
             const response = await productsAPI.list({ limit: 100 });
-            return response.data;
+            return response.data.products;
         },
         enabled: storeHydrated && isAuthenticated, // Wait for both hydration and auth
         staleTime: 10 * 60 * 1000,
@@ -13,6 +13,9 @@ const CATEGORY_CONFIG = {
     human: { icon: User, color: 'green', label: 'Adult' }
 };
 
+// Key-feature polls per grid while generation is pending (~2 minutes)
+const MAX_FEATURE_POLLS = 8;
+
 const SUB_CATEGORY_CONFIGS = {
     dog: [
         { id: 'all', name: 'All Products', icon: ShoppingBag },
@@ -76,9 +79,8 @@ export default function Products() {
     useEffect(() => {
         const syncWishlist = async () => {
             try {
-                const response = await wishlistAPI.get();
-                const backendWishlistIds = response.data.map(item => item.product_id);
-                useWishlistStore.setState({ items: backendWishlistIds });
+                const response = await wishlistAPI.getProductIds();
+                useWishlistStore.setState({ items: response.data });
             } catch (error) {
                 console.error('❌ Failed to sync wishlist:', error);
             }
@@ -147,7 +149,7 @@ export default function Products() {
                     ? { pet_type: currentProfile.profile_category, limit: 100 }
                     : { limit: 100 };
                 const response = await productsAPI.list(params);
-                return response.data;
+                return response.data.products;
             } catch (error) {
                 console.error('❌ Products API Error:', error);
                 throw error;
@@ -158,6 +160,28 @@ export default function Products() {
         staleTime: 5 * 60 * 1000,
     });
 
+    // Key features for every card still missing them, in one request per grid
+    const featureProductIds = (viewMode === 'recommended'
+        ? (recommendationsData?.recommendations?.map(rec => rec.product) || [])
+        : (productsData || []))
+        .filter(p => !(p.key_features || p.ai_key_features || p.attributes?.ai_key_features))
+        .map(p => p.id)
+        .slice(0, 100);
+
+    const { data: gridFeatures = {} } = useQuery({
+        queryKey: ['key-features', featureProductIds],
+        queryFn: async () => {
+            const response = await productsAPI.getKeyFeaturesBatch(featureProductIds);
+            return Object.fromEntries(response.data.results.map(r => [r.product_id, r]));
+        },
+        enabled: featureProductIds.length > 0,
+        // Placeholders are replaced once background generation finishes - give up after a few polls
+        refetchInterval: (query) =>
+            Object.values(query.state.data || {}).some(r => r.pending)
+                && query.state.dataUpdateCount < MAX_FEATURE_POLLS ? 15000 : false,
+        staleTime: 5 * 60 * 1000,
+    });
+
     // Show error state
     if (productsError) {
         return (
@@ -564,6 +588,7 @@ export default function Products() {
                                 <ProductCard
                                     key={product.id}
                                     product={product}
+                                    keyFeatures={gridFeatures[product.id]?.pending ? null : gridFeatures[product.id]?.key_features}
                                     profile={currentProfile}
                                     onAddToCart={() => handleAddToCart(product)}
                                     onCompare={() => handleCompareToggle(product)}
@@ -616,13 +641,14 @@ function FilterSection({ title, children, defaultOpen = false }) {
     );
 }
 
-function ProductCard({ product, profile, onCompare, isSelected, isMaxReached, isInWishlist, onWishlistToggle }) {
+function ProductCard({ product, keyFeatures, profile, onCompare, isSelected, isMaxReached, isInWishlist, onWishlistToggle }) {
     const canSelect = !isMaxReached || isSelected;
     const navigate = useNavigate();
 
     const getProductFeatures = () => {
-        if (product.attributes?.ai_key_features && product.attributes.ai_key_features.length >= 2) {
-            return product.attributes.ai_key_features.slice(0, 2);
+        const aiFeatures = product.key_features || product.ai_key_features || product.attributes?.ai_key_features || keyFeatures;
+        if (aiFeatures && aiFeatures.length >= 2) {
+            return aiFeatures.slice(0, 2);
         }
 
         const attrs = product.attributes || {};
@@ -13,10 +13,7 @@ export default function Wishlist() {
 
     const { data: wishlistItems = [], isLoading, refetch } = useQuery({
         queryKey: ['wishlist'],
-        queryFn: async () => {
-            const response = await wishlistAPI.get();
-            return response.data;
-        },
+        queryFn: () => wishlistAPI.getAll(),
     });
 
     const handleRemove = async (item) => {
@@ -59,8 +59,10 @@ export const profilesAPI = {
 // Products API
 export const productsAPI = {
     list: (params = {}) => apiClient.get('/products/', { params }),
+    facets: (params = {}) => apiClient.get('/products/facets', { params }),
     get: (id) => apiClient.get(`/products/${id}`),
     getKeyFeatures: (id) => apiClient.get(`/products/${id}/key-features`),  // ADD THIS LINE
+    getKeyFeaturesBatch: (productIds) => apiClient.post('/products/key-features:batch', { product_ids: productIds }),
     search: (query, petType) => apiClient.get('/products/search/', { params: { query, pet_type: petType } }),
 };
 
@@ -68,6 +70,8 @@ export const productsAPI = {
 export const recommendationsAPI = {
     get: (profileId, limit = 10, forceRefresh = false) =>
         apiClient.post('/recommendations/', { profile_id: profileId, limit, force_refresh: forceRefresh }),
+    getBatch: (profileIds = null, limit = 10, forceRefresh = false) =>
+        apiClient.post('/recommendations/batch', { profile_ids: profileIds, limit, force_refresh: forceRefresh }),
     compare: (profileId, productIds) =>
         apiClient.post('/recommendations/compare', { profile_id: profileId, product_ids: productIds }),
 };
@@ -80,9 +84,26 @@ export const templatesAPI = {
 };
 
 export const wishlistAPI = {
-    get: () => apiClient.get('/wishlist/'),
+    // One keyset page; pass the previous page's X-Next-Cursor header as params.cursor
+    get: (params = { limit: 100 }) => apiClient.get('/wishlist/', { params }),
+    // Every item, following X-Next-Cursor until the last page
+    getAll: async (params = {}) => {
+        const items = [];
+        let cursor = null;
+        do {
+            const response = await apiClient.get('/wishlist/', {
+                params: { limit: 100, ...params, ...(cursor && { cursor }) },
+            });
+            items.push(...response.data);
+            cursor = response.headers['x-next-cursor'];
+        } while (cursor);
+        return items;
+    },
+    getProductIds: () => apiClient.get('/wishlist/product-ids'),
     add: (productId, profileId = null, notes = null) =>
         apiClient.post('/wishlist/', { product_id: productId, profile_id: profileId, notes }),
+    addMany: (productIds, profileId = null, notes = null) =>
+        apiClient.post('/wishlist/bulk', { product_ids: productIds, profile_id: profileId, notes }),
     remove: (wishlistId) => apiClient.delete(`/wishlist/${wishlistId}`),
     removeByProduct: (productId) => apiClient.delete(`/wishlist/product/${productId}`),
 };